@@ -1,19 +1,34 @@
 from fastapi import FastAPI, HTTPException, Depends
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import List, Optional
+import asyncio
 import boto3
+import httpx
 import json
 import os
 from datetime import datetime
 
 # Importar utilidades
 from src.core.utils.environment import get_environment_config, is_lambda_environment
+from src.core.utils.sse import format_sse
 
+from src.api.middleware import GzipRequestMiddleware
 from src.services.rag_service import RAGService
 from src.services.opensearch_service import OpenSearchService
-from src.services.document_processor_service import DocumentProcessorService
-from src.models.chat_models import ChatRequest, ChatResponse, DocumentRequest
+from src.services.document_processor_service import DocumentProcessorService, INLINE_PAYLOAD_LIMIT
+from src.services.embedding_batcher import EmbeddingBatcher
+from src.models.chat_models import (
+    ChatRequest, ChatResponse, DocumentRequest,
+    BatchRequest, BatchSubRequest, BatchSubResponse, BatchResponse
+)
+
+try:
+    from snapshot_restore_py import register_after_restore
+except ImportError:
+    # Solo disponible en el runtime de Lambda
+    register_after_restore = None
 
 # Cargar configuración de entorno
 if not is_lambda_environment():
@@ -24,7 +39,8 @@ if not is_lambda_environment():
 app = FastAPI(
     title="AWS RAG Chatbot API",
     description="API para chatbot con Retrieval-Augmented Generation usando AWS",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # Configuración CORS
@@ -36,11 +52,64 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Servicios (inicializar solo cuando se necesiten)
+app.add_middleware(GzipRequestMiddleware)
+
+# Búsquedas con más resultados que este umbral usan el plugin asíncrono
+ASYNC_SEARCH_THRESHOLD = 100
+
+# Máximo de sub-peticiones por llamada a /batch
+MAX_BATCH_REQUESTS = 20
+
+def _create_opensearch_service() -> OpenSearchService:
+    service = OpenSearchService()
+    # Titan v2 no admite lotes: una ventana de 5 ms agrupa las consultas simultáneas
+    # y los textos repetidos del lote se calculan una sola vez
+    service.embedding_batcher = EmbeddingBatcher(
+        service._get_embedding_async,
+        max_batch_size=32,
+        max_wait_ms=5
+    )
+    return service
+
+def _init_service(factory):
+    """Crear un servicio en la carga del módulo sin impedir el arranque si falla"""
+    try:
+        return factory()
+    except Exception as e:
+        print(f"Error initializing {factory.__name__}: {e}")
+        return None
+
+# Servicios compartidos (se crean en _init_services o en la primera petición que los usa)
 rag_service = None
 opensearch_service = None
 document_processor_service = None
 
+def _warm():
+    """Abrir las conexiones TLS con OpenSearch y Bedrock antes de la primera petición"""
+    if opensearch_service is None:
+        return
+    try:
+        opensearch_service.client.ping()
+        opensearch_service._get_embedding_sync("warmup")
+    except Exception as e:
+        print(f"Warmup failed: {e}")
+
+def _init_services():
+    """Crear los servicios (si fallan se reintentan en la primera petición) y, en Lambda, precalentarlos"""
+    global rag_service, opensearch_service, document_processor_service
+    rag_service = _init_service(RAGService)
+    opensearch_service = _init_service(_create_opensearch_service)
+    document_processor_service = _init_service(DocumentProcessorService)
+    if is_lambda_environment():
+        _warm()
+
+# Con SnapStart las conexiones abiertas durante el init no sobreviven a la restauración:
+# el snapshot solo incluye los módulos importados y los servicios se crean al restaurar
+if register_after_restore is not None and is_lambda_environment():
+    register_after_restore(_init_services)
+else:
+    _init_services()
+
 def get_rag_service():
     global rag_service
     if rag_service is None:
@@ -50,7 +119,7 @@ def get_rag_service():
 def get_opensearch_service():
     global opensearch_service
     if opensearch_service is None:
-        opensearch_service = OpenSearchService()
+        opensearch_service = _create_opensearch_service()
     return opensearch_service
 
 def get_document_processor_service():
@@ -59,6 +128,13 @@ def get_document_processor_service():
         document_processor_service = DocumentProcessorService()
     return document_processor_service
 
+@app.on_event("shutdown")
+async def shutdown():
+    if opensearch_service is not None:
+        if opensearch_service.embedding_batcher is not None:
+            await opensearch_service.embedding_batcher.stop()
+        await opensearch_service.close()
+
 @app.get("/")
 async def root():
     return {"message": "AWS RAG Chatbot API", "status": "running"}
@@ -86,7 +162,7 @@ async def chat(request: ChatRequest):
         response = await rag_svc.generate_response(
             question=request.message,
             context_documents=relevant_docs,
-            chat_history=request.chat_history or []
+            chat_history=request.history()
         )
         
         return ChatResponse(
@@ -99,11 +175,57 @@ async def chat(request: ChatRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """
+    Chat con RAG emitiendo la respuesta como Server-Sent Events
+    (eventos con {"delta"} y un evento final "done" con fuentes y confianza)
+    """
+    try:
+        opensearch_svc = get_opensearch_service()
+        rag_svc = get_rag_service()
+        
+        # Buscar documentos relevantes (antes de empezar a emitir, para poder devolver 500)
+        relevant_docs = await opensearch_svc.search_documents(
+            query=request.message,
+            max_results=request.max_results or 5
+        )
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    async def events():
+        try:
+            async for delta in rag_svc.generate_response_stream(
+                question=request.message,
+                context_documents=relevant_docs,
+                chat_history=request.history()
+            ):
+                yield format_sse({"delta": delta})
+            
+            yield format_sse({
+                "sources": rag_svc._prepare_sources(relevant_docs),
+                "confidence": rag_svc._calculate_confidence(relevant_docs),
+                "timestamp": datetime.now().isoformat()
+            }, event="done")
+            
+        except Exception as e:
+            yield format_sse({"message": str(e)}, event="error")
+    
+    return StreamingResponse(events(), media_type="text/event-stream")
+
 @app.post("/documents/upload")
 async def upload_document(request: DocumentRequest):
     """
     Subir y indexar documentos
     """
+    # En Lambda (límite de 6 MB por invocación) los documentos grandes van por S3
+    if is_lambda_environment() and len(request.content.encode('utf-8')) >= INLINE_PAYLOAD_LIMIT:
+        raise HTTPException(
+            status_code=413,
+            detail="Document too large for direct upload; upload it to S3 and use /documents/process-s3"
+        )
+    
     try:
         processor = get_document_processor_service()
         
@@ -179,12 +301,90 @@ async def search_documents(query: str, max_results: int = 10):
     """
     try:
         opensearch_svc = get_opensearch_service()
+        
+        # Búsquedas grandes van por el plugin asíncrono para no bloquear
+        if max_results > ASYNC_SEARCH_THRESHOLD:
+            search = await opensearch_svc.submit_async_search(query, max_results)
+            return {"results": search["results"], "async_id": search["id"], "state": search["state"]}
+        
         results = await opensearch_svc.search_documents(query, max_results)
         return {"results": results}
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/search/async/{search_id}")
+async def get_async_search(search_id: str):
+    """
+    Consultar una búsqueda asíncrona
+    """
+    try:
+        opensearch_svc = get_opensearch_service()
+        search = await opensearch_svc.get_async_search(search_id)
+        return {"results": search["results"], "async_id": search["id"], "state": search["state"]}
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.delete("/search/async/{search_id}")
+async def delete_async_search(search_id: str):
+    """
+    Eliminar una búsqueda asíncrona
+    """
+    try:
+        opensearch_svc = get_opensearch_service()
+        await opensearch_svc.delete_async_search(search_id)
+        return {"message": "Async search deleted successfully"}
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+async def _dispatch_sub_request(client: httpx.AsyncClient, sub_request: BatchSubRequest) -> BatchSubResponse:
+    """Ejecutar una sub-petición contra la propia app sin salir del proceso"""
+    if sub_request.url.split("?", 1)[0].rstrip("/") == "/batch":
+        return BatchSubResponse(id=sub_request.id, status=400, body={"detail": "Nested batch requests are not allowed"})
+    
+    response = await client.request(
+        sub_request.method.upper(),
+        sub_request.url,
+        json=sub_request.body
+    )
+    
+    try:
+        body = response.json()
+    except ValueError:
+        body = response.text
+    
+    return BatchSubResponse(id=sub_request.id, status=response.status_code, body=body)
+
+@app.post("/batch", response_model=BatchResponse)
+async def batch(request: BatchRequest):
+    """
+    Ejecutar varias peticiones en paralelo dentro de una sola invocación
+    """
+    if len(request.requests) > MAX_BATCH_REQUESTS:
+        raise HTTPException(status_code=400, detail=f"A batch can contain at most {MAX_BATCH_REQUESTS} requests")
+    
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://batch") as client:
+            responses = await asyncio.gather(
+                *[_dispatch_sub_request(client, sub_request) for sub_request in request.requests]
+            )
+        
+        return BatchResponse(responses=responses)
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    workers = int(os.environ.get("WEB_CONCURRENCY", 2 * (os.cpu_count() or 1) + 1))
+    uvicorn.run(
+        "src.api.main:app",
+        host="0.0.0.0",
+        port=8000,
+        loop="uvloop",
+        http="httptools",
+        workers=workers
+    )
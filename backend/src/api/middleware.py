@@ -0,0 +1,50 @@
+from fastapi.responses import ORJSONResponse
+
+from src.core.utils.compression import gunzip_limited, PayloadTooLargeError, MAX_DECOMPRESSED_SIZE
+
+class GzipRequestMiddleware:
+    """Descomprimir cuerpos de petición con Content-Encoding: gzip (uvicorn no lo hace)"""
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or (b"content-encoding", b"gzip") not in scope["headers"]:
+            await self.app(scope, receive, send)
+            return
+        
+        chunks = []
+        received = 0
+        while True:
+            message = await receive()
+            chunk = message.get("body", b"")
+            received += len(chunk)
+            if received > MAX_DECOMPRESSED_SIZE:
+                # El comprimido nunca es mayor que lo descomprimido que aceptamos
+                await ORJSONResponse({"detail": "Request body too large"}, status_code=413)(scope, receive, send)
+                return
+            chunks.append(chunk)
+            if not message.get("more_body"):
+                break
+        
+        try:
+            body = gunzip_limited(b"".join(chunks))
+        except PayloadTooLargeError as e:
+            await ORJSONResponse({"detail": str(e)}, status_code=413)(scope, receive, send)
+            return
+        except ValueError as e:
+            await ORJSONResponse({"detail": str(e)}, status_code=400)(scope, receive, send)
+            return
+        
+        headers = [(k, v) for k, v in scope["headers"] if k not in (b"content-encoding", b"content-length")]
+        headers.append((b"content-length", str(len(body)).encode()))
+        delivered = False
+        
+        async def receive_body():
+            nonlocal delivered
+            if delivered:
+                return await receive()
+            delivered = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        
+        await self.app({**scope, "headers": headers}, receive_body, send)
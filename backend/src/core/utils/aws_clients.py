@@ -0,0 +1,75 @@
+import os
+import asyncio
+from contextlib import AsyncExitStack
+from functools import lru_cache
+
+import aioboto3
+import boto3
+from aiobotocore.config import AioConfig
+from botocore.config import Config
+
+# Sesión compartida por todo el contenedor
+_SESSION = boto3.session.Session()
+
+# Pool HTTPS con keep-alive para reutilizar conexiones entre invocaciones
+CLIENT_CONFIG = Config(
+    max_pool_connections=64,
+    retries={'max_attempts': 5, 'mode': 'adaptive'},
+    tcp_keepalive=True
+)
+
+@lru_cache(maxsize=None)
+def get_client(service_name: str, region_name: str = None):
+    """Obtener un cliente boto3 reutilizable para el servicio indicado"""
+    return _SESSION.client(
+        service_name,
+        region_name=region_name or os.environ.get('AWS_REGION', 'us-east-1'),
+        config=CLIENT_CONFIG
+    )
+
+# Configuración equivalente para los clientes aioboto3
+ASYNC_CLIENT_CONFIG = AioConfig(
+    max_pool_connections=64,
+    retries={'max_attempts': 5, 'mode': 'adaptive'}
+)
+
+# Clientes aioboto3 abiertos por event loop: {loop: {(servicio, región): (cliente, stack)}}
+_ASYNC_SESSION = aioboto3.Session()
+_async_clients = {}
+_async_client_locks = {}
+
+async def get_async_client(service_name: str, region_name: str = None):
+    """Obtener un cliente aioboto3 reutilizable en el event loop actual"""
+    loop = asyncio.get_running_loop()
+    region_name = region_name or os.environ.get('AWS_REGION', 'us-east-1')
+    key = (service_name, region_name)
+    
+    clients = _async_clients.get(loop)
+    if clients is not None and key in clients:
+        return clients[key][0]
+    
+    # Olvidar los clientes de loops ya cerrados (sus conexiones no se pueden reutilizar)
+    for stale in [other for other in _async_clients if other.is_closed()]:
+        _async_clients.pop(stale, None)
+        _async_client_locks.pop(stale, None)
+    
+    # Un solo cliente por clave aunque haya varias primeras llamadas concurrentes
+    lock = _async_client_locks.setdefault(loop, {}).setdefault(key, asyncio.Lock())
+    async with lock:
+        clients = _async_clients.setdefault(loop, {})
+        if key not in clients:
+            stack = AsyncExitStack()
+            client = await stack.enter_async_context(
+                _ASYNC_SESSION.client(service_name, region_name=region_name, config=ASYNC_CLIENT_CONFIG)
+            )
+            clients[key] = (client, stack)
+    
+    return clients[key][0]
+
+async def close_async_clients() -> None:
+    """Cerrar los clientes aioboto3 abiertos en el event loop actual"""
+    loop = asyncio.get_running_loop()
+    clients = _async_clients.pop(loop, {})
+    _async_client_locks.pop(loop, None)
+    for _, stack in clients.values():
+        await stack.aclose()
@@ -0,0 +1,32 @@
+import os
+import zlib
+
+# Tamaño máximo de un cuerpo de petición descomprimido (protección frente a gzip bombs)
+MAX_DECOMPRESSED_SIZE = int(os.environ.get('MAX_DECOMPRESSED_BODY_BYTES', str(10 * 1024 * 1024)))
+
+class PayloadTooLargeError(ValueError):
+    """El cuerpo descomprimido supera el tamaño máximo permitido"""
+
+def gunzip_limited(data: bytes, max_size: int = MAX_DECOMPRESSED_SIZE) -> bytes:
+    """Descomprimir gzip (uno o varios miembros) sin pasar de max_size bytes
+
+    Lanza PayloadTooLargeError si la salida supera max_size y ValueError si el
+    cuerpo no es gzip válido o está truncado.
+    """
+    output = bytearray()
+    while data:
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        try:
+            # Un byte más del límite basta para detectar que se supera
+            output += decompressor.decompress(data, max_size - len(output) + 1)
+        except zlib.error as e:
+            raise ValueError(f"Invalid gzip body: {str(e)}")
+
+        if len(output) > max_size:
+            raise PayloadTooLargeError(f"Decompressed body exceeds {max_size} bytes")
+        if not decompressor.eof:
+            raise ValueError("Invalid gzip body: truncated stream")
+
+        # Siguiente miembro concatenado (si lo hay)
+        data = decompressor.unused_data
+    return bytes(output)
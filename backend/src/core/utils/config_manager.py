@@ -1,29 +1,48 @@
 import json
-import boto3
+import time
 import os
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 from botocore.exceptions import ClientError
 
+from src.core.utils.aws_clients import get_client
+
 class ConfigManager:
     """Manages configuration from SSM Parameter Store and Secrets Manager"""
     
     def __init__(self):
-        self.ssm_client = boto3.client('ssm')
-        self.secrets_client = boto3.client('secretsmanager')
+        self.ssm_client = get_client('ssm')
+        self.secrets_client = get_client('secretsmanager')
         self.environment = os.environ.get('ENVIRONMENT', 'dev')
         self.project_name = os.environ.get('PROJECT_NAME', 'aws-chatbot')
         self.ssm_prefix = f"/chatbot/{self.environment}"
         
-        # Cache for parameters
+        # Cache for parameters: {full_name: (value, expires_at)}
         self._cache = {}
+        self._cache_ttl = int(os.environ.get('SSM_CACHE_TTL', '300'))
+    
+    def _get_cached(self, full_name: str) -> Optional[str]:
+        """Return a cached value if present and not expired"""
+        entry = self._cache.get(full_name)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at < time.monotonic():
+            del self._cache[full_name]
+            return None
+        return value
+    
+    def _set_cached(self, full_name: str, value: str) -> None:
+        """Store a value in the cache with the configured TTL"""
+        self._cache[full_name] = (value, time.monotonic() + self._cache_ttl)
         
     def get_parameter(self, parameter_name: str, decrypt: bool = False) -> Optional[str]:
         """Get a single parameter from SSM Parameter Store"""
         full_name = f"{self.ssm_prefix}/{parameter_name}"
         
         # Check cache first
-        if full_name in self._cache:
-            return self._cache[full_name]
+        cached = self._get_cached(full_name)
+        if cached is not None:
+            return cached
             
         try:
             response = self.ssm_client.get_parameter(
@@ -31,7 +50,7 @@ class ConfigManager:
                 WithDecryption=decrypt
             )
             value = response['Parameter']['Value']
-            self._cache[full_name] = value
+            self._set_cached(full_name, value)
             return value
         except ClientError as e:
             if e.response['Error']['Code'] == 'ParameterNotFound':
@@ -39,6 +58,33 @@ class ConfigManager:
                 return None
             raise
     
+    def get_parameters(self, names: List[str], decrypt: bool = False) -> Dict[str, Optional[str]]:
+        """Get several parameters from SSM Parameter Store in a single batch"""
+        values = {}
+        missing = []
+        for name in names:
+            full_name = f"{self.ssm_prefix}/{name}"
+            cached = self._get_cached(full_name)
+            if cached is not None:
+                values[name] = cached
+            else:
+                missing.append(full_name)
+        
+        # GetParameters accepts at most 10 names per call
+        for start in range(0, len(missing), 10):
+            batch = missing[start:start + 10]
+            response = self.ssm_client.get_parameters(
+                Names=batch,
+                WithDecryption=decrypt
+            )
+            for param in response['Parameters']:
+                self._set_cached(param['Name'], param['Value'])
+                values[param['Name'].replace(f"{self.ssm_prefix}/", "", 1)] = param['Value']
+            for full_name in response.get('InvalidParameters', []):
+                print(f"Parameter {full_name} not found")
+        
+        return {name: values.get(name) for name in names}
+    
     def get_parameters_by_path(self, path: str) -> Dict[str, str]:
         """Get all parameters under a path"""
         full_path = f"{self.ssm_prefix}/{path}"
@@ -72,15 +118,16 @@ class ConfigManager:
     
     def get_vpc_config(self) -> Dict[str, Any]:
         """Get VPC configuration"""
+        params = self.get_parameters(['vpc/id', 'vpc/subnet_ids', 'vpc/security_group_id'])
         return {
-            'vpc_id': self.get_parameter('vpc/id'),
-            'subnet_ids': self.get_parameter('vpc/subnet_ids'),
-            'security_group_id': self.get_parameter('vpc/security_group_id')
+            'vpc_id': params['vpc/id'],
+            'subnet_ids': params['vpc/subnet_ids'],
+            'security_group_id': params['vpc/security_group_id']
         }
     
     def get_opensearch_config(self) -> Dict[str, Any]:
         """Get OpenSearch configuration"""
-        endpoint = self.get_parameter('opensearch/endpoint')
+        endpoint = self.get_parameters(['opensearch/endpoint'])['opensearch/endpoint']
         
         # Get credentials from Secrets Manager
         secret_name = os.environ.get('OPENSEARCH_SECRET_NAME', 
@@ -96,7 +143,7 @@ class ConfigManager:
     def get_s3_config(self) -> Dict[str, Any]:
         """Get S3 configuration"""
         return {
-            'documents_bucket': self.get_parameter('s3/documents_bucket')
+            'documents_bucket': self.get_parameters(['s3/documents_bucket'])['s3/documents_bucket']
         }
     
     def get_all_config(self) -> Dict[str, Any]:
@@ -1,26 +1,21 @@
 import os
+import time
 import asyncio
 from functools import wraps
 from typing import Union, Callable, Any
 
 def sync_async_compatible(func):
     """
-    Decorator para hacer que una función funcione tanto en modo síncrono como asíncrono
+    Decorator para hacer que una función async funcione tanto en modo síncrono como asíncrono:
+    dentro de un event loop devuelve la corrutina (para hacer await), fuera de él la ejecuta
     """
     @wraps(func)
     def wrapper(*args, **kwargs):
-        # Si estamos en un contexto async, usar await
-        try:
-            loop = asyncio.get_event_loop()
-            if loop.is_running():
-                # Ya estamos en un contexto async, ejecutar directamente
-                return func(*args, **kwargs)
-            else:
-                # No hay loop corriendo, crear uno
-                return asyncio.run(func(*args, **kwargs))
-        except RuntimeError:
-            # No hay loop, ejecutar síncronamente
+        if asyncio._get_running_loop() is not None:
+            # Ya estamos en un contexto async, el llamador hace await
             return func(*args, **kwargs)
+        # No hay loop corriendo, ejecutar hasta completar
+        return asyncio.run(func(*args, **kwargs))
     
     return wrapper
 
@@ -28,31 +23,51 @@ def is_lambda_environment() -> bool:
     """Detectar si estamos corriendo en Lambda"""
     return os.getenv('AWS_LAMBDA_FUNCTION_NAME') is not None
 
+# Cliente SSM compartido por el contenedor (el handshake TLS se paga una sola vez)
+if is_lambda_environment():
+    from src.core.utils.aws_clients import get_client
+    _ssm_client = get_client('ssm')
+else:
+    _ssm_client = None
+
+# Cache de parámetros de OpenSearch
+_SSM_CACHE_TTL = int(os.environ.get('SSM_CACHE_TTL', '300'))
+_opensearch_params = None
+_opensearch_params_expires_at = 0.0
+
+def _get_opensearch_parameters() -> dict:
+    """Obtener parámetros de OpenSearch desde SSM con una sola llamada, cacheados con TTL"""
+    global _opensearch_params, _opensearch_params_expires_at
+    
+    if _opensearch_params is not None and time.monotonic() < _opensearch_params_expires_at:
+        return _opensearch_params
+    
+    path = f"/chatbot/{os.environ.get('ENVIRONMENT', 'dev')}/opensearch"
+    parameters = {}
+    kwargs = {'Path': path, 'WithDecryption': True}
+    while True:
+        response = _ssm_client.get_parameters_by_path(**kwargs)
+        for param in response['Parameters']:
+            parameters[param['Name'].rsplit('/', 1)[-1]] = param['Value']
+        if not response.get('NextToken'):
+            break
+        kwargs['NextToken'] = response['NextToken']
+    
+    _opensearch_params = parameters
+    _opensearch_params_expires_at = time.monotonic() + _SSM_CACHE_TTL
+    return parameters
+
 def get_environment_config() -> dict:
     """Obtener configuración basada en el entorno"""
     if is_lambda_environment():
-        import boto3
-        
-        # Obtener parámetros de SSM
-        ssm_client = boto3.client('ssm', region_name=os.environ.get('AWS_REGION', 'us-east-1'))
-        
         try:
-            # Obtener endpoint desde SSM
-            endpoint_response = ssm_client.get_parameter(Name='/chatbot/dev/opensearch/endpoint')
-            endpoint = endpoint_response['Parameter']['Value']
-            
-            # Obtener username desde SSM
-            username_response = ssm_client.get_parameter(Name='/chatbot/dev/opensearch/username')
-            username = username_response['Parameter']['Value']
-            
-            # Obtener password desde SSM
-            password_response = ssm_client.get_parameter(Name='/chatbot/dev/opensearch/password', WithDecryption=True)
-            password = password_response['Parameter']['Value']
+            # Obtener endpoint, username y password desde SSM
+            parameters = _get_opensearch_parameters()
             
             return {
-                'opensearch_endpoint': endpoint,
-                'opensearch_username': username, 
-                'opensearch_password': password,
+                'opensearch_endpoint': parameters['endpoint'],
+                'opensearch_username': parameters['username'], 
+                'opensearch_password': parameters['password'],
                 'aws_region': os.environ.get('AWS_REGION', 'us-east-1'),
             }
         except Exception as e:
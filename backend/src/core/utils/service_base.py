@@ -1,6 +1,8 @@
 import asyncio
+import atexit
 import functools
-from typing import Any, Callable, TypeVar, Union
+import os
+from typing import Any, Callable, Optional, TypeVar, Union
 from concurrent.futures import ThreadPoolExecutor
 import threading
 
@@ -9,22 +11,43 @@ T = TypeVar('T')
 class ServiceBase:
     """Base class para servicios que necesitan trabajar en modo sync/async"""
     
+    # Executor compartido por todos los servicios del proceso
+    _executor: Optional[ThreadPoolExecutor] = None
+    _executor_lock = threading.Lock()
+    
     def __init__(self):
-        self._executor = ThreadPoolExecutor(max_workers=4)
+        self._get_executor()
+    
+    @classmethod
+    def _get_executor(cls) -> ThreadPoolExecutor:
+        """Crear (una sola vez) el executor compartido dimensionado según las vCPUs"""
+        if ServiceBase._executor is None:
+            with ServiceBase._executor_lock:
+                if ServiceBase._executor is None:
+                    ServiceBase._executor = ThreadPoolExecutor(
+                        max_workers=min(32, (os.cpu_count() or 2) * 2),
+                        thread_name_prefix='svc'
+                    )
+                    atexit.register(ServiceBase.shutdown)
+        return ServiceBase._executor
+    
+    @classmethod
+    def shutdown(cls, wait: bool = False) -> None:
+        """Cerrar el executor compartido"""
+        with ServiceBase._executor_lock:
+            if ServiceBase._executor is not None:
+                ServiceBase._executor.shutdown(wait=wait)
+                ServiceBase._executor = None
     
     def _is_async_context(self) -> bool:
         """Detectar si estamos en un contexto async"""
-        try:
-            loop = asyncio.get_running_loop()
-            return True
-        except RuntimeError:
-            return False
+        return asyncio._get_running_loop() is not None
     
     async def _run_in_executor(self, func: Callable[..., T], *args, **kwargs) -> T:
         """Ejecutar función síncrona en executor"""
         loop = asyncio.get_running_loop()
         partial_func = functools.partial(func, *args, **kwargs)
-        return await loop.run_in_executor(self._executor, partial_func)
+        return await loop.run_in_executor(self._get_executor(), partial_func)
     
     def _make_sync_async_compatible(self, func: Callable[..., T]) -> Callable[..., Union[T, Any]]:
         """Crear una versión de función que funcione en ambos contextos"""
@@ -0,0 +1,8 @@
+from typing import Any
+
+import orjson
+
+def format_sse(data: Any, event: str = None) -> str:
+    """Formatear un evento Server-Sent Events con datos JSON"""
+    frame = f"event: {event}\n" if event else ""
+    return f"{frame}data: {orjson.dumps(data).decode()}\n\n"
@@ -0,0 +1,44 @@
+import re
+from bisect import bisect_left, bisect_right
+from typing import List
+
+# Límites de corte: fin de frase o párrafo
+_SEPARATORS = re.compile(r'(?<=[.!?])\s+|\n\n+')
+
+def split_text(text: str, chunk_size: int = 1000, chunk_overlap: int = 200) -> List[str]:
+    """Dividir texto en chunks de hasta chunk_size caracteres con solapamiento (una sola pasada)"""
+    # Posiciones donde termina un chunk y donde puede empezar el siguiente
+    cut_points = []
+    resume_points = []
+    for match in _SEPARATORS.finditer(text):
+        cut_points.append(match.start())
+        resume_points.append(match.end())
+
+    chunks = []
+    start = 0
+    length = len(text)
+    while start < length:
+        limit = start + chunk_size
+        if limit >= length:
+            end = length
+        else:
+            # Último límite de frase dentro de la ventana; si no hay, último espacio
+            i = bisect_right(cut_points, limit) - 1
+            if i >= 0 and cut_points[i] > start:
+                end = cut_points[i]
+            else:
+                space = text.rfind(' ', start + 1, limit)
+                end = space if space > start else limit
+
+        chunk = text[start:end].strip()
+        if chunk:
+            chunks.append(chunk)
+
+        if end >= length:
+            break
+
+        # Solapamiento: retomar en el primer inicio de frase dentro de los últimos chunk_overlap caracteres
+        j = bisect_left(resume_points, max(end - chunk_overlap, start + 1))
+        start = resume_points[j] if j < len(resume_points) and resume_points[j] <= end else end
+
+    return chunks
@@ -1,18 +1,37 @@
-import json
+import os
+import orjson
 import logging
-from typing import Dict, Any
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Tuple
+
+from src.services.document_processor_service import DocumentProcessorService, INLINE_PAYLOAD_LIMIT
 
 # Configurar logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+def _dumps(body: Any) -> str:
+    """Serializar el cuerpo de la respuesta (API Gateway requiere str)"""
+    return orjson.dumps(body, default=str, option=orjson.OPT_NAIVE_UTC).decode()
+
+# Servicio reutilizado entre invocaciones del contenedor
+_processor = None
+
+def _get_processor() -> DocumentProcessorService:
+    global _processor
+    if _processor is None:
+        _processor = DocumentProcessorService()
+    return _processor
+
 def lambda_handler(event, context):
     """
     Lambda handler especializado para procesamiento de documentos
     Se usa como función separada para tareas pesadas
     """
     try:
-        logger.info(f"Document processor received event: {json.dumps(event, default=str)}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Document processor received event: %.1024s", event)
         
         # Detectar tipo de evento
         if 'Records' in event:
@@ -26,54 +45,93 @@ def lambda_handler(event, context):
         logger.error(f"Error in document processor: {str(e)}")
         return {
             'statusCode': 500,
-            'body': json.dumps({'error': str(e)})
+            'body': _dumps({'error': str(e)})
         }
 
+def _extract_record(processor: DocumentProcessorService, record: Dict[str, Any]) -> Dict[str, Any]:
+    """Descargar y extraer el texto de un registro S3 del evento"""
+    bucket = record['s3']['bucket']['name']
+    key = record['s3']['object']['key']
+    
+    try:
+        return {'bucket': bucket, 'key': key, 'document': processor._extract_s3_file_sync(bucket, key)}
+        
+    except Exception as e:
+        logger.error(f"Error processing {key}: {str(e)}")
+        return {'bucket': bucket, 'key': key, 'error': str(e)}
+
 def handle_s3_event(event) -> Dict[str, Any]:
     """Procesar archivos subidos a S3"""
-    from services.document_processor_service import DocumentProcessorService
+    processor = _get_processor()
+    records = [record for record in event['Records'] if record['eventSource'] == 'aws:s3']
     
-    processor = DocumentProcessorService()
-    results = []
+    # Lambda no soporta multiprocessing (sin /dev/shm) y el trabajo por archivo es de red
+    # (S3, Textract), así que la extracción se reparte en hilos
+    with ThreadPoolExecutor(max_workers=max(1, min(len(records), (os.cpu_count() or 1) * 4))) as executor:
+        extracted = list(executor.map(functools.partial(_extract_record, processor), records))
     
-    for record in event['Records']:
-        if record['eventSource'] != 'aws:s3':
+    # Indexar todos los documentos extraídos (por chunks) con llamadas _bulk
+    documents = [item for item in extracted if 'document' in item]
+    try:
+        for item in documents:
+            processor.add_pending_document(**item['document'])
+        bulk_result = processor.flush_pending_documents()
+        outcomes = [
+            (doc_id, bulk_result['failed'].get(doc_id))
+            for doc_id in bulk_result['document_ids']
+        ]
+    except Exception as e:
+        # Si falla el lote completo, indexar registro a registro para aislar los fallos
+        logger.error(f"Bulk indexing failed, indexing records one by one: {str(e)}")
+        outcomes = [_index_record(processor, item) for item in documents]
+    
+    results = []
+    outcomes = iter(outcomes)
+    for item in extracted:
+        if 'error' in item:
+            results.append(item)
             continue
-            
-        bucket = record['s3']['bucket']['name']
-        key = record['s3']['object']['key']
         
-        try:
-            # Procesar archivo de S3
-            result = processor._process_s3_file_sync(bucket, key)
-            results.append(result)
-            logger.info(f"Successfully processed: {key}")
-            
-        except Exception as e:
-            logger.error(f"Error processing {key}: {str(e)}")
+        doc_id, error = next(outcomes)
+        if error is not None:
+            logger.error(f"Error indexing {item['key']}: {error}")
+            results.append({'bucket': item['bucket'], 'key': item['key'], 'error': str(error)})
+        else:
+            logger.info(f"Successfully processed: {item['key']}")
             results.append({
-                'bucket': bucket,
-                'key': key,
-                'error': str(e)
+                'document_id': doc_id,
+                'bucket': item['bucket'],
+                'key': item['key'],
+                'content_length': len(item['document']['content']),
+                'metadata': item['document']['metadata']
             })
     
+    failed_count = sum(1 for result in results if 'error' in result)
+    
     return {
         'statusCode': 200,
-        'body': json.dumps({
-            'message': f'Processed {len(results)} documents',
+        'body': _dumps({
+            'message': f'Processed {len(results) - failed_count} documents, {failed_count} failed',
+            'processed': len(results) - failed_count,
+            'failed': failed_count,
             'results': results
-        }, default=str)
+        })
     }
 
+def _index_record(processor: DocumentProcessorService, item: Dict[str, Any]) -> Tuple[str, Any]:
+    """Indexar un documento extraído por separado ((document_id, error o None))"""
+    try:
+        result = processor.opensearch_service.index_chunked_documents([item['document']])
+        doc_id = result['document_ids'][0]
+        return doc_id, result['failed'].get(doc_id)
+    except Exception as e:
+        return None, str(e)
+
 def handle_direct_invocation(event) -> Dict[str, Any]:
     """Procesar documentos enviados directamente"""
-    from services.document_processor_service import DocumentProcessorService
-    
-    processor = DocumentProcessorService()
-    
     # Parsear cuerpo del evento
     if 'body' in event:
-        body = json.loads(event['body']) if isinstance(event['body'], str) else event['body']
+        body = orjson.loads(event['body']) if isinstance(event['body'], str) else event['body']
     else:
         body = event
     
@@ -81,9 +139,18 @@ def handle_direct_invocation(event) -> Dict[str, Any]:
     if not body.get('title') or not body.get('content'):
         return {
             'statusCode': 400,
-            'body': json.dumps({'error': 'title and content are required'})
+            'body': _dumps({'error': 'title and content are required'})
+        }
+    
+    # Solo documentos pequeños se indexan desde el payload; los grandes van por S3
+    if len(body['content'].encode('utf-8')) >= INLINE_PAYLOAD_LIMIT:
+        return {
+            'statusCode': 413,
+            'body': _dumps({'error': 'Document too large for direct invocation; upload it to S3 instead'})
         }
     
+    processor = _get_processor()
+    
     try:
         # Procesar documento
         result = processor._process_direct_document_sync(
@@ -94,7 +161,7 @@ def handle_direct_invocation(event) -> Dict[str, Any]:
         
         return {
             'statusCode': 200,
-            'body': json.dumps({
+            'body': _dumps({
                 'message': 'Document processed successfully',
                 'document_id': result['document_id']
             })
@@ -103,5 +170,5 @@ def handle_direct_invocation(event) -> Dict[str, Any]:
     except Exception as e:
         return {
             'statusCode': 500,
-            'body': json.dumps({'error': str(e)})
+            'body': _dumps({'error': str(e)})
         }
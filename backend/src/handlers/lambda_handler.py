@@ -1,8 +1,15 @@
+import asyncio
+import uvloop
 from mangum import Mangum
+
+# Usar uvloop como event loop antes de construir Mangum
+asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+
 from src.api.main import app
 
-# Envolver FastAPI app para Lambda
-handler = Mangum(app, lifespan="off")
+# Envolver FastAPI app para la Lambda de administración (servida bajo /admin);
+# los endpoints de alto tráfico los atiende simple_handler sin FastAPI
+handler = Mangum(app, lifespan="off", api_gateway_base_path="/admin")
 
 def lambda_handler(event, context):
     """AWS Lambda handler"""
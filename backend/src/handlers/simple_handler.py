@@ -1,14 +1,84 @@
-import json
-import boto3
 import os
-from typing import Dict, Any
+import base64
+import logging
+import asyncio
+import orjson
+import uvloop
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List
 from datetime import datetime
 
+from src.core.utils.aws_clients import get_client
+from src.core.utils.sse import format_sse
+from src.core.utils.compression import gunzip_limited, PayloadTooLargeError
+from src.services.opensearch_service import OpenSearchService
+from src.services.rag_service import RAGService
+
+# Configurar logging
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Clientes AWS reutilizados entre invocaciones del contenedor
+_SSM = get_client('ssm')
+_S3 = get_client('s3')
+
+# Cabeceras comunes a todas las respuestas
+_CORS_HEADERS = {
+    'Content-Type': 'application/json',
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Methods': 'GET, POST, PUT, DELETE, OPTIONS',
+    'Access-Control-Allow-Headers': 'Content-Type, Authorization'
+}
+
+# Event loop persistente para todo el contenedor
+asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+_LOOP = asyncio.new_event_loop()
+asyncio.set_event_loop(_LOOP)
+
+# Servicios reutilizados por el contenedor (se crean en la primera petición que los usa)
+_os_service = None
+_rag_service = None
+
+def _get_os() -> OpenSearchService:
+    global _os_service
+    if _os_service is None:
+        _os_service = OpenSearchService()
+    return _os_service
+
+def _get_rag() -> RAGService:
+    global _rag_service
+    if _rag_service is None:
+        _rag_service = RAGService()
+    return _rag_service
+
+def _dumps(body: Any) -> str:
+    """Serializar el cuerpo de la respuesta (API Gateway requiere str)"""
+    return orjson.dumps(body).decode()
+
+async def _answer(os_service, rag_service, message: str, max_results: int, chat_history: List[Dict[str, str]]) -> Dict[str, Any]:
+    """Buscar documentos y generar la respuesta RAG en una sola corrutina"""
+    docs = await os_service.search_documents(message, max_results)
+    return await rag_service.generate_response(message, docs, chat_history)
+
+def _request_body(event: Dict[str, Any]) -> Any:
+    """Cuerpo de la petición, decodificando base64 y gzip si API Gateway lo entrega sin descomprimir
+
+    Lanza PayloadTooLargeError o ValueError si el gzip es demasiado grande o inválido.
+    """
+    body = event.get('body')
+    if body and event.get('isBase64Encoded'):
+        body = base64.b64decode(body)
+    headers = {k.lower(): v for k, v in (event.get('headers') or {}).items()}
+    if body and headers.get('content-encoding') == 'gzip' and isinstance(body, bytes) and body[:2] == b'\x1f\x8b':
+        body = gunzip_limited(body)
+    return body
+
 def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
     Simple Lambda handler for health check and basic API functionality
     """
-    print(f"Event: {json.dumps(event)}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Event: %.1024s", event)
     
     # Get HTTP method and path
     http_method = event.get('httpMethod', 'GET')
@@ -18,13 +88,8 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     if path == '/health' and http_method == 'GET':
         return {
             'statusCode': 200,
-            'headers': {
-                'Content-Type': 'application/json',
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Methods': 'GET, POST, PUT, DELETE, OPTIONS',
-                'Access-Control-Allow-Headers': 'Content-Type, Authorization'
-            },
-            'body': json.dumps({
+            'headers': _CORS_HEADERS,
+            'body': _dumps({
                 'status': 'healthy',
                 'message': 'AWS Chatbot API is running',
                 'timestamp': '2025-07-18T19:51:09.138Z',
@@ -36,11 +101,10 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     # Test SSM parameter access
     elif path == '/config' and http_method == 'GET':
         try:
-            ssm_client = boto3.client('ssm')
             env = os.environ.get('ENVIRONMENT', 'dev')
             
             # Try to get some SSM parameters
-            response = ssm_client.get_parameters_by_path(
+            response = _SSM.get_parameters_by_path(
                 Path=f'/chatbot/{env}',
                 Recursive=True
             )
@@ -49,11 +113,8 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             
             return {
                 'statusCode': 200,
-                'headers': {
-                    'Content-Type': 'application/json',
-                    'Access-Control-Allow-Origin': '*'
-                },
-                'body': json.dumps({
+                'headers': _CORS_HEADERS,
+                'body': _dumps({
                     'status': 'success',
                     'parameters': parameters,
                     'environment': env
@@ -62,11 +123,8 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         except Exception as e:
             return {
                 'statusCode': 500,
-                'headers': {
-                    'Content-Type': 'application/json',
-                    'Access-Control-Allow-Origin': '*'
-                },
-                'body': json.dumps({
+                'headers': _CORS_HEADERS,
+                'body': _dumps({
                     'status': 'error',
                     'message': str(e)
                 })
@@ -75,19 +133,15 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     # Create OpenSearch index
     elif path == '/create-index' and http_method == 'POST':
         try:
-            from src.services.opensearch_service import OpenSearchService
-            os_service = OpenSearchService()
+            os_service = _get_os()
             
             # Force create index even in Lambda environment
             os_service._create_index_if_not_exists()
             
             return {
                 'statusCode': 200,
-                'headers': {
-                    'Content-Type': 'application/json',
-                    'Access-Control-Allow-Origin': '*'
-                },
-                'body': json.dumps({
+                'headers': _CORS_HEADERS,
+                'body': _dumps({
                     'status': 'success',
                     'message': 'Index created successfully'
                 })
@@ -95,11 +149,35 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         except Exception as e:
             return {
                 'statusCode': 500,
-                'headers': {
-                    'Content-Type': 'application/json',
-                    'Access-Control-Allow-Origin': '*'
-                },
-                'body': json.dumps({
+                'headers': _CORS_HEADERS,
+                'body': _dumps({
+                    'status': 'error',
+                    'message': str(e)
+                })
+            }
+    
+    # Migrate the index to the current mapping. Each call copies for at most
+    # MIGRATION_TIME_BUDGET seconds (API Gateway times out at 29 s): repeat it with
+    # {"after": <cursor>} until the status is "copied", then POST {"swap": true}.
+    elif path == '/migrate-index' and http_method == 'POST':
+        try:
+            payload = orjson.loads(_request_body(event) or '{}')
+            os_service = _get_os()
+            if payload.get('swap'):
+                result = os_service.swap_index_alias()
+            else:
+                result = os_service.migrate_index(payload.get('after'))
+            
+            return {
+                'statusCode': 200,
+                'headers': _CORS_HEADERS,
+                'body': _dumps(result)
+            }
+        except Exception as e:
+            return {
+                'statusCode': 500,
+                'headers': _CORS_HEADERS,
+                'body': _dumps({
                     'status': 'error',
                     'message': str(e)
                 })
@@ -108,63 +186,73 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     # Process documents from S3
     elif path == '/process-s3-docs' and http_method == 'POST':
         try:
-            import boto3
-            from src.services.opensearch_service import OpenSearchService
-            from src.core.utils.environment import get_environment_config
             
             # Get S3 bucket name
-            config = get_environment_config()
-            ssm_client = boto3.client('ssm', region_name=config['aws_region'])
-            bucket_response = ssm_client.get_parameter(Name='/chatbot/dev/s3/documents_bucket')
+            bucket_response = _SSM.get_parameter(Name='/chatbot/dev/s3/documents_bucket')
             bucket_name = bucket_response['Parameter']['Value']
             
             # List and process documents from S3
-            s3_client = boto3.client('s3')
-            os_service = OpenSearchService()
+            os_service = _get_os()
             
-            # List objects in bucket
-            response = s3_client.list_objects_v2(Bucket=bucket_name)
-            processed_count = 0
+            # List objects in bucket (paginated, sin límite de 1000 claves)
+            paginator = _S3.get_paginator('list_objects_v2')
+            keys = [
+                obj['Key']
+                for page in paginator.paginate(Bucket=bucket_name)
+                for obj in page.get('Contents', [])
+            ]
             
-            if 'Contents' in response:
-                for obj in response['Contents']:
-                    key = obj['Key']
-                    
+            # Marca de tiempo común a todo el lote
+            processed_at = datetime.now().isoformat()
+            
+            def download(key):
+                """Descargar un documento de S3"""
+                try:
+                    # Download file content
+                    file_response = _S3.get_object(Bucket=bucket_name, Key=key)
+                    body = file_response['Body'].read()
                     try:
-                        # Download file content
-                        file_response = s3_client.get_object(Bucket=bucket_name, Key=key)
-                        content = file_response['Body'].read().decode('utf-8')
-                        
-                        # Extract title from filename
-                        title = key.replace('.md', '').replace('_', ' ').title()
-                        
-                        # Index document
-                        os_service._index_document_sync(
-                            title=title,
-                            content=content,
-                            metadata={
-                                'source': 's3',
-                                'bucket': bucket_name,
-                                'key': key,
-                                'processed_at': datetime.now().isoformat()
-                            }
-                        )
-                        processed_count += 1
-                        print(f"Processed document: {title}")
-                        
-                    except Exception as doc_error:
-                        print(f"Error processing {key}: {doc_error}")
+                        content = body.decode('utf-8')
+                    except UnicodeDecodeError:
+                        # Intentar con latin-1 como fallback
+                        content = body.decode('latin-1')
+                    
+                    # Extract title from filename
+                    title = key.replace('.md', '').replace('_', ' ').title()
+                    
+                    return {
+                        'title': title,
+                        'content': content,
+                        'metadata': {
+                            'source': 's3',
+                            'bucket': bucket_name,
+                            'key': key,
+                            'processed_at': processed_at
+                        }
+                    }
+                except Exception as doc_error:
+                    print(f"Error processing {key}: {doc_error}")
+                    return None
+            
+            # Descargas concurrentes; embeddings en paralelo + _bulk en el servicio
+            with ThreadPoolExecutor(max_workers=32) as executor:
+                documents = [document for document in executor.map(download, keys) if document is not None]
+            
+            bulk_result = os_service.index_chunked_documents(documents)
+            processed_count = len(bulk_result['document_ids']) - len(bulk_result['failed'])
+            
+            for error in bulk_result['errors']:
+                print(f"Error indexing document: {error}")
             
             return {
                 'statusCode': 200,
-                'headers': {
-                    'Content-Type': 'application/json',
-                    'Access-Control-Allow-Origin': '*'
-                },
-                'body': json.dumps({
+                'headers': _CORS_HEADERS,
+                'body': _dumps({
                     'status': 'success',
                     'message': f'Processed {processed_count} documents from S3',
                     'processed_count': processed_count,
+                    'chunks_indexed': bulk_result['indexed'],
+                    'chunks_unchanged': bulk_result['skipped'],
                     'bucket': bucket_name
                 })
             }
@@ -172,11 +260,8 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         except Exception as e:
             return {
                 'statusCode': 500,
-                'headers': {
-                    'Content-Type': 'application/json',
-                    'Access-Control-Allow-Origin': '*'
-                },
-                'body': json.dumps({
+                'headers': _CORS_HEADERS,
+                'body': _dumps({
                     'status': 'error',
                     'message': str(e)
                 })
@@ -185,19 +270,15 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     # Test OpenSearch connectivity
     elif path == '/opensearch-test' and http_method == 'GET':
         try:
-            from src.services.opensearch_service import OpenSearchService
-            os_service = OpenSearchService()
+            os_service = _get_os()
             
             # Test connection
             info = os_service.client.info()
             
             return {
                 'statusCode': 200,
-                'headers': {
-                    'Content-Type': 'application/json',
-                    'Access-Control-Allow-Origin': '*'
-                },
-                'body': json.dumps({
+                'headers': _CORS_HEADERS,
+                'body': _dumps({
                     'status': 'success',
                     'opensearch_info': info,
                     'message': 'OpenSearch is accessible'
@@ -206,35 +287,45 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         except Exception as e:
             return {
                 'statusCode': 500,
-                'headers': {
-                    'Content-Type': 'application/json',
-                    'Access-Control-Allow-Origin': '*'
-                },
-                'body': json.dumps({
+                'headers': _CORS_HEADERS,
+                'body': _dumps({
                     'status': 'error',
                     'message': f'OpenSearch connection failed: {str(e)}'
                 })
             }
 
     # Chat endpoint
-    elif path == '/chat' and http_method == 'POST':
+    elif path in ('/chat', '/chat/stream') and http_method == 'POST':
+        try:
+            body = _request_body(event)
+        except PayloadTooLargeError as e:
+            return {
+                'statusCode': 413,
+                'headers': _CORS_HEADERS,
+                'body': _dumps({'message': str(e)})
+            }
+        except ValueError as e:
+            return {
+                'statusCode': 400,
+                'headers': _CORS_HEADERS,
+                'body': _dumps({'message': str(e)})
+            }
+        
         try:
             # Parse request
-            payload = json.loads(event.get('body', '{}'))
+            payload = orjson.loads(body or '{}')
             message = payload.get('message', '')
             chat_history = payload.get('chat_history', [])
             max_results = payload.get('max_results', 5)
             
             # Try RAG workflow first
             try:
-                import asyncio
-                from src.services.opensearch_service import OpenSearchService
-                from src.services.rag_service import RAGService
-                os_service = OpenSearchService()
-                rag_service = RAGService()
+                os_service = _get_os()
+                rag_service = _get_rag()
                 # Perform document search and generate answer
-                docs = asyncio.run(os_service.search_documents(message, max_results))
-                rag_resp = asyncio.run(rag_service.generate_response(message, docs, chat_history))
+                rag_resp = _LOOP.run_until_complete(
+                    _answer(os_service, rag_service, message, max_results, chat_history)
+                )
                 response_body = {
                     'message': rag_resp['answer'],
                     'confidence': rag_resp['confidence'],
@@ -250,34 +341,31 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                     'timestamp': datetime.now().isoformat()
                 }
             
+            if path == '/chat/stream':
+                # Mismo contrato SSE que la API; API Gateway entrega el cuerpo completo de una vez
+                return {
+                    'statusCode': 200,
+                    'headers': {**_CORS_HEADERS, 'Content-Type': 'text/event-stream'},
+                    'body': format_sse({'delta': response_body.pop('message')}) + format_sse(response_body, event='done')
+                }
+            
             return {
                 'statusCode': 200,
-                'headers': {
-                    'Content-Type': 'application/json',
-                    'Access-Control-Allow-Origin': '*',
-                    'Access-Control-Allow-Methods': 'GET, POST, OPTIONS',
-                    'Access-Control-Allow-Headers': 'Content-Type, Authorization'
-                },
-                'body': json.dumps(response_body)
+                'headers': _CORS_HEADERS,
+                'body': _dumps(response_body)
             }
         except Exception as e:
             return {
                 'statusCode': 500,
-                'headers': {
-                    'Content-Type': 'application/json',
-                    'Access-Control-Allow-Origin': '*'
-                },
-                'body': json.dumps({'message': str(e)})
+                'headers': _CORS_HEADERS,
+                'body': _dumps({'message': str(e)})
             }
     
     # Default response
     return {
         'statusCode': 404,
-        'headers': {
-            'Content-Type': 'application/json',
-            'Access-Control-Allow-Origin': '*'
-        },
-        'body': json.dumps({
+        'headers': _CORS_HEADERS,
+        'body': _dumps({
             'status': 'error',
             'message': 'Not found',
             'path': path,
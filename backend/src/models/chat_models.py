@@ -12,6 +12,10 @@ class ChatRequest(BaseModel):
     chat_history: Optional[List[ChatMessage]] = []
     max_results: Optional[int] = 5
     user_id: Optional[str] = None
+    
+    def history(self) -> List[Dict[str, Any]]:
+        """Historial como diccionarios (el formato que espera RAGService)"""
+        return [message.model_dump() for message in self.chat_history or []]
 
 class ChatResponse(BaseModel):
     message: str
@@ -39,3 +43,20 @@ class SearchResult(BaseModel):
     content: str
     score: float
     metadata: Dict[str, Any]
+
+class BatchSubRequest(BaseModel):
+    id: str
+    url: str
+    method: str = "GET"
+    body: Optional[Any] = None
+
+class BatchRequest(BaseModel):
+    requests: List[BatchSubRequest]
+
+class BatchSubResponse(BaseModel):
+    id: str
+    status: int
+    body: Any = None
+
+class BatchResponse(BaseModel):
+    responses: List[BatchSubResponse]
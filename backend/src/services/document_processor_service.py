@@ -1,17 +1,45 @@
 import os
-import boto3
+import gc
+import time
+import codecs
+import tempfile
+import asyncio
+import threading
 import json
-from typing import Dict, Any, List
+from boto3.s3.transfer import TransferConfig
+from typing import Dict, Any, List, Iterable, Iterator
 from datetime import datetime
 import logging
 
 # Importar utilidades
 from src.core.utils.environment import get_environment_config, is_lambda_environment
 from src.core.utils.service_base import ServiceBase
-from services.opensearch_service import OpenSearchService
+from src.core.utils.aws_clients import get_async_client, get_client
+from src.services.opensearch_service import OpenSearchService
 
 logger = logging.getLogger(__name__)
 
+# Documentos por debajo de este tamaño se indexan directamente desde el payload
+# (por encima se acercan al límite de 6 MB de invocación síncrona de Lambda)
+INLINE_PAYLOAD_LIMIT = 5_000_000
+
+# Objetos mayores a este tamaño se descargan por rangos en paralelo
+LARGE_OBJECT_THRESHOLD = 16 * 1024 * 1024
+
+S3_TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=LARGE_OBJECT_THRESHOLD,
+    multipart_chunksize=8 * 1024 * 1024,
+    max_concurrency=8
+)
+
+# Tamaño de los bloques leídos del stream de S3
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Textract asíncrono: intervalo mínimo entre arranques de trabajos y backoff del sondeo
+TEXTRACT_START_INTERVAL = float(os.environ.get('TEXTRACT_START_INTERVAL', '0.5'))
+TEXTRACT_POLL_INTERVAL = 1.0
+TEXTRACT_MAX_POLL_INTERVAL = 5.0
+
 class DocumentProcessorService(ServiceBase):
     """Servicio para procesar diferentes tipos de documentos"""
     
@@ -23,12 +51,19 @@ class DocumentProcessorService(ServiceBase):
         self.aws_region = config['aws_region']
         
         # Configurar clientes AWS
-        self.s3_client = boto3.client('s3', region_name=self.aws_region)
-        self.textract_client = boto3.client('textract', region_name=self.aws_region)
+        self.s3_client = get_client('s3', self.aws_region)
+        self.textract_client = get_client('textract', self.aws_region)
         
         # Servicio OpenSearch
         self.opensearch_service = OpenSearchService()
         
+        # Ritmo de arranques de trabajos Textract (compartido por hilos y event loop)
+        self._textract_start_lock = threading.Lock()
+        self._next_textract_start = 0.0
+        
+        # Documentos pendientes de indexar en bloque
+        self._pending_documents: List[Dict[str, Any]] = []
+        
         # Tipos de archivo soportados
         self.supported_extensions = {
             '.pdf': self._process_pdf,
@@ -37,13 +72,83 @@ class DocumentProcessorService(ServiceBase):
             '.md': self._process_markdown
         }
     
+    def _extract_s3_file_sync(self, bucket: str, key: str) -> Dict[str, Any]:
+        """Descargar y extraer el texto de un archivo de S3 (sin indexarlo)"""
+        logger.info(f"Processing file: {key} from bucket: {bucket}")
+        
+        # Obtener metadata del archivo
+        response = self.s3_client.head_object(Bucket=bucket, Key=key)
+        file_size = response['ContentLength']
+        last_modified = response['LastModified']
+        
+        # Determinar tipo de archivo
+        file_extension = os.path.splitext(key)[1].lower()
+        
+        if file_extension not in self.supported_extensions:
+            raise ValueError(f"Unsupported file type: {file_extension}")
+        
+        # Procesar según el tipo
+        processor = self.supported_extensions[file_extension]
+        content = processor(bucket, key, file_size=file_size)
+        
+        return {
+            'title': os.path.basename(key),
+            'content': content,
+            'metadata': self._build_s3_metadata(bucket, key, file_size, last_modified, file_extension)
+        }
+    
     def _process_s3_file_sync(self, bucket: str, key: str) -> Dict[str, Any]:
         """Procesar archivo desde S3 (versión síncrona)"""
+        try:
+            document = self._extract_s3_file_sync(bucket, key)
+            
+            # Indexar en OpenSearch (por chunks)
+            result = self.opensearch_service.index_chunked_documents([document])
+            document_id = result['document_ids'][0]
+            if document_id in result['failed']:
+                raise Exception(f"Error indexing document: {result['failed'][document_id]}")
+            
+            return {
+                'document_id': document_id,
+                'bucket': bucket,
+                'key': key,
+                'content_length': len(document['content']),
+                'metadata': document['metadata']
+            }
+            
+        except Exception as e:
+            logger.error(f"Error processing file {key}: {str(e)}")
+            raise
+    
+    def add_pending_document(self, title: str, content: str, metadata: Dict[str, Any] = None) -> None:
+        """Acumular un documento para indexarlo en el próximo flush"""
+        self._pending_documents.append({
+            'title': title,
+            'content': content,
+            'metadata': metadata or {}
+        })
+    
+    def flush_pending_documents(self) -> Dict[str, Any]:
+        """Dividir en chunks e indexar todos los documentos acumulados con llamadas _bulk"""
+        documents, self._pending_documents = self._pending_documents, []
+        if not documents:
+            return {'document_ids': [], 'chunks': 0, 'indexed': 0, 'skipped': 0, 'errors': [], 'failed': {}}
+        result = self.opensearch_service.index_chunked_documents(documents)
+        
+        # Liberar ya los textos del lote (el contenedor de Lambda se reutiliza)
+        del documents
+        gc.collect()
+        return result
+    
+    async def process_s3_file(self, bucket: str, key: str) -> Dict[str, Any]:
+        """Procesar archivo desde S3 (versión async)"""
         try:
             logger.info(f"Processing file: {key} from bucket: {bucket}")
             
+            s3_client = await get_async_client('s3', self.aws_region)
+            
             # Obtener metadata del archivo
-            response = self.s3_client.head_object(Bucket=bucket, Key=key)
+            response = await s3_client.head_object(Bucket=bucket, Key=key)
             file_size = response['ContentLength']
             last_modified = response['LastModified']
             
@@ -53,21 +158,18 @@ class DocumentProcessorService(ServiceBase):
             if file_extension not in self.supported_extensions:
                 raise ValueError(f"Unsupported file type: {file_extension}")
             
-            # Procesar según el tipo
-            processor = self.supported_extensions[file_extension]
-            content = processor(bucket, key)
-            
-            # Extraer metadata
-            metadata = {
-                'source': f"s3://{bucket}/{key}",
-                'file_size': file_size,
-                'last_modified': last_modified.isoformat(),
-                'file_type': file_extension,
-                'processed_at': datetime.now().isoformat()
-            }
+            if file_extension == '.pdf':
+                content = await self._process_pdf_async(bucket, key, file_size)
+            elif file_size > LARGE_OBJECT_THRESHOLD:
+                # Descarga por rangos en paralelo con el gestor de transferencias
+                content = await self._run_in_executor(self._download_and_process_text, bucket, key, file_size)
+            else:
+                content = await self._download_text_async(bucket, key)
+            
+            metadata = self._build_s3_metadata(bucket, key, file_size, last_modified, file_extension)
             
-            # Indexar en OpenSearch
-            result = self.opensearch_service._index_document_sync(
+            # Indexar en OpenSearch (por chunks)
+            result = await self.opensearch_service.index_chunked_document(
                 title=os.path.basename(key),
                 content=content,
                 metadata=metadata
@@ -85,28 +187,63 @@ class DocumentProcessorService(ServiceBase):
             logger.error(f"Error processing file {key}: {str(e)}")
             raise
     
-    async def process_s3_file(self, bucket: str, key: str) -> Dict[str, Any]:
-        """Procesar archivo desde S3 (versión async)"""
-        if self._is_async_context():
-            return await self._run_in_executor(self._process_s3_file_sync, bucket, key)
-        else:
-            return self._process_s3_file_sync(bucket, key)
+    def _build_s3_metadata(self, bucket: str, key: str, file_size: int, last_modified: datetime, file_extension: str) -> Dict[str, Any]:
+        """Metadata de un archivo procesado desde S3"""
+        return {
+            'source': f"s3://{bucket}/{key}",
+            'file_size': file_size,
+            'last_modified': last_modified.isoformat(),
+            'file_type': file_extension,
+            'processed_at': datetime.now().isoformat()
+        }
+    
+    def _build_direct_metadata(self, content: str, metadata: Dict[str, Any] = None) -> Dict[str, Any]:
+        """Metadata de un documento subido directamente"""
+        proc_metadata = {
+            'processed_at': datetime.now().isoformat(),
+            'source': 'direct_upload',
+            'content_length': len(content)
+        }
+        
+        if metadata:
+            proc_metadata.update(metadata)
+        
+        return proc_metadata
     
     def _process_direct_document_sync(self, title: str, content: str, metadata: Dict[str, Any] = None) -> Dict[str, Any]:
         """Procesar documento directo (versión síncrona)"""
         try:
             # Agregar metadata de procesamiento
-            proc_metadata = {
-                'processed_at': datetime.now().isoformat(),
-                'source': 'direct_upload',
-                'content_length': len(content)
+            proc_metadata = self._build_direct_metadata(content, metadata)
+            
+            # Indexar en OpenSearch (por chunks)
+            result = self.opensearch_service.index_chunked_documents([{
+                'title': title,
+                'content': content,
+                'metadata': proc_metadata
+            }])
+            document_id = result['document_ids'][0]
+            if document_id in result['failed']:
+                raise Exception(f"Error indexing document: {result['failed'][document_id]}")
+            
+            return {
+                'document_id': document_id,
+                'title': title,
+                'content_length': len(content),
+                'metadata': proc_metadata
             }
             
-            if metadata:
-                proc_metadata.update(metadata)
+        except Exception as e:
+            logger.error(f"Error processing direct document: {str(e)}")
+            raise
+    
+    async def process_direct_document(self, title: str, content: str, metadata: Dict[str, Any] = None) -> Dict[str, Any]:
+        """Procesar documento directo (versión async)"""
+        try:
+            proc_metadata = self._build_direct_metadata(content, metadata)
             
-            # Indexar en OpenSearch
-            result = self.opensearch_service._index_document_sync(
+            # Indexar en OpenSearch (por chunks)
+            result = await self.opensearch_service.index_chunked_document(
                 title=title,
                 content=content,
                 metadata=proc_metadata
@@ -123,58 +260,121 @@ class DocumentProcessorService(ServiceBase):
             logger.error(f"Error processing direct document: {str(e)}")
             raise
     
-    async def process_direct_document(self, title: str, content: str, metadata: Dict[str, Any] = None) -> Dict[str, Any]:
-        """Procesar documento directo (versión async)"""
-        if self._is_async_context():
-            return await self._run_in_executor(self._process_direct_document_sync, title, content, metadata)
-        else:
-            return self._process_direct_document_sync(title, content, metadata)
+    def _textract_lines(self, pages: Iterable[Dict[str, Any]]) -> str:
+        """Unir las líneas (LINE) de las páginas de resultados de Textract"""
+        return '\n'.join(
+            block['Text']
+            for page in pages
+            for block in page['Blocks']
+            if block['BlockType'] == 'LINE'
+        )
     
-    def _process_pdf(self, bucket: str, key: str) -> str:
-        """Procesar archivo PDF usando Textract"""
+    def _process_pdf(self, bucket: str, key: str, file_size: int = None) -> str:
+        """Procesar archivo PDF usando Textract (trabajo asíncrono, sondeo bloqueante)"""
         try:
-            # Usar Textract para extraer texto
-            response = self.textract_client.detect_document_text(
-                Document={
-                    'S3Object': {
-                        'Bucket': bucket,
-                        'Name': key
-                    }
-                }
+            time.sleep(self._reserve_textract_start())
+            job_id = self.textract_client.start_document_text_detection(
+                DocumentLocation={'S3Object': {'Bucket': bucket, 'Name': key}}
+            )['JobId']
+            
+            # Esperar a que termine el trabajo
+            interval = TEXTRACT_POLL_INTERVAL
+            while True:
+                response = self.textract_client.get_document_text_detection(JobId=job_id)
+                if response['JobStatus'] != 'IN_PROGRESS':
+                    break
+                time.sleep(interval)
+                interval = min(interval * 2, TEXTRACT_MAX_POLL_INTERVAL)
+            
+            if response['JobStatus'] == 'FAILED':
+                raise Exception(response.get('StatusMessage', 'Textract job failed'))
+            
+            # Recorrer todas las páginas de resultados
+            pages = [response]
+            while 'NextToken' in response:
+                response = self.textract_client.get_document_text_detection(
+                    JobId=job_id, NextToken=response['NextToken']
+                )
+                pages.append(response)
+            
+            return self._textract_lines(pages)
+            
+        except Exception as e:
+            logger.error(f"Error processing PDF: {str(e)}")
+            # Fallback: descargar y procesar localmente si Textract falla
+            return self._download_and_process_text(bucket, key, file_size)
+    
+    def _reserve_textract_start(self) -> float:
+        """Reservar el siguiente hueco de arranque de Textract (segundos a esperar)"""
+        with self._textract_start_lock:
+            now = time.monotonic()
+            start_at = max(now, self._next_textract_start)
+            self._next_textract_start = start_at + TEXTRACT_START_INTERVAL
+            return start_at - now
+    
+    async def _process_pdf_async(self, bucket: str, key: str, file_size: int = None) -> str:
+        """Procesar archivo PDF usando Textract (sondeo sin bloquear el event loop)"""
+        try:
+            textract_client = await get_async_client('textract', self.aws_region)
+            
+            await asyncio.sleep(self._reserve_textract_start())
+            response = await textract_client.start_document_text_detection(
+                DocumentLocation={'S3Object': {'Bucket': bucket, 'Name': key}}
             )
+            job_id = response['JobId']
+            
+            # Esperar a que termine el trabajo
+            interval = TEXTRACT_POLL_INTERVAL
+            while True:
+                response = await textract_client.get_document_text_detection(JobId=job_id)
+                if response['JobStatus'] != 'IN_PROGRESS':
+                    break
+                await asyncio.sleep(interval)
+                interval = min(interval * 2, TEXTRACT_MAX_POLL_INTERVAL)
             
-            # Extraer texto de la respuesta
-            text_lines = []
-            for item in response['Blocks']:
-                if item['BlockType'] == 'LINE':
-                    text_lines.append(item['Text'])
+            if response['JobStatus'] == 'FAILED':
+                raise Exception(response.get('StatusMessage', 'Textract job failed'))
             
-            return '\n'.join(text_lines)
+            # Recorrer todas las páginas de resultados
+            pages = [response]
+            while 'NextToken' in response:
+                response = await textract_client.get_document_text_detection(
+                    JobId=job_id, NextToken=response['NextToken']
+                )
+                pages.append(response)
+            
+            return self._textract_lines(pages)
             
         except Exception as e:
             logger.error(f"Error processing PDF: {str(e)}")
             # Fallback: descargar y procesar localmente si Textract falla
-            return self._download_and_process_text(bucket, key)
+            return await self._run_in_executor(self._download_and_process_text, bucket, key, file_size)
     
-    def _process_text(self, bucket: str, key: str) -> str:
+    def _process_text(self, bucket: str, key: str, file_size: int = None) -> str:
         """Procesar archivo de texto plano"""
-        return self._download_and_process_text(bucket, key)
+        return self._download_and_process_text(bucket, key, file_size)
     
-    def _process_docx(self, bucket: str, key: str) -> str:
+    def _process_docx(self, bucket: str, key: str, file_size: int = None) -> str:
         """Procesar archivo DOCX"""
         # Por ahora, tratarlo como texto plano
         # En el futuro se puede agregar python-docx
-        return self._download_and_process_text(bucket, key)
+        return self._download_and_process_text(bucket, key, file_size)
     
-    def _process_markdown(self, bucket: str, key: str) -> str:
+    def _process_markdown(self, bucket: str, key: str, file_size: int = None) -> str:
         """Procesar archivo Markdown"""
-        return self._download_and_process_text(bucket, key)
+        return self._download_and_process_text(bucket, key, file_size)
     
-    def _download_and_process_text(self, bucket: str, key: str) -> str:
-        """Descargar archivo y procesar como texto"""
+    async def _download_text_async(self, bucket: str, key: str) -> str:
+        """Descargar archivo como texto con el cliente aioboto3
+
+        Solo se usa para objetos de hasta LARGE_OBJECT_THRESHOLD: el cuerpo se lee
+        completo para poder reintentar la decodificación con latin-1 sin otra descarga.
+        """
         try:
-            response = self.s3_client.get_object(Bucket=bucket, Key=key)
-            content = response['Body'].read()
+            s3_client = await get_async_client('s3', self.aws_region)
+            response = await s3_client.get_object(Bucket=bucket, Key=key)
+            async with response['Body'] as stream:
+                content = await stream.read()
             
             # Intentar decodificar como UTF-8
             try:
@@ -186,3 +386,58 @@ class DocumentProcessorService(ServiceBase):
         except Exception as e:
             logger.error(f"Error downloading file {key}: {str(e)}")
             raise
+    
+    def stream_text(self, bucket: str, key: str, encoding: str = 'utf-8') -> Iterator[str]:
+        """Leer un archivo de S3 como texto por bloques
+
+        Evita tener el cuerpo completo en bytes junto al texto decodificado; quien
+        une los bloques sigue teniendo el texto entero en memoria.
+        """
+        response = self.s3_client.get_object(Bucket=bucket, Key=key)
+        yield from self._decode_chunks(response['Body'].iter_chunks(STREAM_CHUNK_SIZE), encoding)
+    
+    def _decode_chunks(self, chunks: Iterable[bytes], encoding: str) -> Iterator[str]:
+        """Decodificar bloques de bytes de forma incremental"""
+        decoder = codecs.getincrementaldecoder(encoding)()
+        
+        for chunk in chunks:
+            text = decoder.decode(chunk)
+            if text:
+                yield text
+        
+        tail = decoder.decode(b'', final=True)
+        if tail:
+            yield tail
+    
+    def _download_and_process_text(self, bucket: str, key: str, file_size: int = None) -> str:
+        """Descargar archivo y procesar como texto
+
+        La decodificación es incremental, lo que reduce el pico de memoria (no hay
+        copia completa en bytes), pero el resultado es el texto completo: el
+        troceado posterior no es incremental.
+        """
+        try:
+            if file_size is not None and file_size > LARGE_OBJECT_THRESHOLD:
+                # Objetos grandes: GETs por rangos en paralelo a un archivo temporal en /tmp
+                with tempfile.TemporaryFile() as spool:
+                    self.s3_client.download_fileobj(bucket, key, spool, Config=S3_TRANSFER_CONFIG)
+                    
+                    # Intentar decodificar como UTF-8
+                    try:
+                        spool.seek(0)
+                        return ''.join(self._decode_chunks(iter(lambda: spool.read(STREAM_CHUNK_SIZE), b''), 'utf-8'))
+                    except UnicodeDecodeError:
+                        # Intentar con latin-1 como fallback
+                        spool.seek(0)
+                        return ''.join(self._decode_chunks(iter(lambda: spool.read(STREAM_CHUNK_SIZE), b''), 'latin-1'))
+            
+            # Intentar decodificar como UTF-8
+            try:
+                return ''.join(self.stream_text(bucket, key))
+            except UnicodeDecodeError:
+                # Intentar con latin-1 como fallback
+                return ''.join(self.stream_text(bucket, key, 'latin-1'))
+                
+        except Exception as e:
+            logger.error(f"Error downloading file {key}: {str(e)}")
+            raise
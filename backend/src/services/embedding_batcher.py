@@ -0,0 +1,95 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+class EmbeddingBatcher:
+    """Agrupa peticiones de embedding concurrentes en micro-lotes"""
+
+    def __init__(
+        self,
+        embed: Callable[[str], Awaitable[List[float]]],
+        max_batch_size: int = 32,
+        max_wait_ms: int = 5
+    ):
+        self._embed = embed
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._batches: Set[asyncio.Task] = set()
+
+    def _ensure_started(self) -> None:
+        """Arrancar el worker en el loop actual (Mangum corre con lifespan="off")"""
+        loop = asyncio.get_running_loop()
+        if self._worker is not None and self._loop is loop and not self._worker.done():
+            return
+        self._loop = loop
+        self._queue = asyncio.Queue()
+        self._worker = loop.create_task(self._run())
+
+    async def process(self, text: str) -> List[float]:
+        """Encolar un texto y esperar su embedding"""
+        self._ensure_started()
+        future = self._loop.create_future()
+        await self._queue.put((text, future))
+        return await future
+
+    async def stop(self) -> None:
+        """Detener el worker y fallar las peticiones que siguen en cola"""
+        if self._worker is not None:
+            self._worker.cancel()
+            self._worker = None
+
+        for task in list(self._batches):
+            task.cancel()
+
+        while self._queue is not None and not self._queue.empty():
+            _, future = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError("EmbeddingBatcher stopped"))
+
+    async def _run(self) -> None:
+        """Recolectar lotes: lo ya encolado más lo que llegue dentro de max_wait_ms"""
+        while True:
+            batch = [await self._queue.get()]
+
+            # Primero las peticiones que ya estaban en cola
+            while len(batch) < self.max_batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            deadline = self._loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - self._loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            # Guardar la referencia de la tarea hasta que termine
+            task = self._loop.create_task(self._process_batch(batch))
+            self._batches.add(task)
+            task.add_done_callback(self._batches.discard)
+
+    async def _process_batch(self, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        """Calcular los embeddings del lote (textos repetidos se calculan una vez)"""
+        texts = list(dict.fromkeys(text for text, _ in batch))
+        try:
+            results = await asyncio.gather(*(self._embed(text) for text in texts), return_exceptions=True)
+        except asyncio.CancelledError:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(RuntimeError("EmbeddingBatcher stopped"))
+            raise
+        by_text: Dict[str, object] = dict(zip(texts, results))
+
+        for text, future in batch:
+            if future.done():
+                continue
+            result = by_text[text]
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
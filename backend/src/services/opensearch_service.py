@@ -1,16 +1,200 @@
 import os
-import json
-import boto3
-from typing import List, Dict, Any
-from opensearchpy import OpenSearch, RequestsHttpConnection
+import orjson
+from typing import List, Dict, Any, Tuple, Iterator, Union
+from opensearchpy import OpenSearch, RequestsHttpConnection, AsyncOpenSearch, AIOHttpConnection, helpers
 from datetime import datetime
 import hashlib
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
+import time
+import threading
+from array import array
+from functools import lru_cache
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from itertools import islice
+from opensearchpy.exceptions import NotFoundError
+from opensearchpy.serializer import JSONSerializer
 
 # Importar utilidades
 from src.core.utils.environment import get_environment_config, is_lambda_environment
 from src.core.utils.service_base import ServiceBase
+from src.core.utils.aws_clients import get_async_client, get_client, close_async_clients
+from src.core.utils.text_splitter import split_text
+
+# Llamadas concurrentes a Bedrock al calcular embeddings de un lote
+EMBEDDING_CONCURRENCY = 32
+
+# Modelo de embeddings (Titan v2 es determinista para una misma entrada)
+EMBEDDING_MODEL_ID = "amazon.titan-embed-text-v2:0"
+
+# Embeddings ya calculados por (modelo, sha256 del texto), compartidos en el contenedor.
+# Se guardan como float32 (array('f')): ~4x menos memoria que una lista de floats
+_EMBEDDING_CACHE_SIZE = int(os.environ.get('EMBEDDING_CACHE_SIZE', '10000'))
+_embedding_cache: "OrderedDict[Tuple[str, str], array]" = OrderedDict()
+_embedding_cache_lock = threading.Lock()
+
+# Tamaño de los chunks que se embeben e indexan (Titan v2 admite hasta 8k tokens por entrada)
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 200
+
+# Peticiones _bulk concurrentes y lotes preparados en espera
+BULK_THREAD_COUNT = int(os.environ.get('OPENSEARCH_BULK_THREADS', '8'))
+BULK_QUEUE_SIZE = 4
+
+# Titan Embeddings v2 devuelve vectores normalizados de 1024 dimensiones
+EMBEDDING_DIMENSION = 1024
+
+# Decimales de cada componente en el payload _bulk (el índice guarda float32 igualmente)
+EMBEDDING_BULK_DECIMALS = 5
+
+# Intervalo de refresco del índice (una subida directa es buscable en ~1 s)
+INDEX_REFRESH_INTERVAL = "1s"
+
+# Cargas con al menos estos chunks desactivan el refresco mientras duran
+BULK_INGEST_MIN_CHUNKS = int(os.environ.get('OPENSEARCH_BULK_INGEST_MIN_CHUNKS', '2000'))
+
+# Alias por el que se lee y escribe; apunta al índice físico f"{INDEX_ALIAS}-v{INDEX_VERSION}"
+INDEX_ALIAS = "chatbot-documents"
+
+# Versión del mapeo: al cambiarla, los índices existentes se migran con migrate_index()
+INDEX_VERSION = 2
+
+# Documentos leídos por lote al migrar el índice
+MIGRATION_BATCH_SIZE = 50
+
+# Segundos de copia por llamada a migrate_index (API Gateway corta a los 29 s y la Lambda a los 30 s)
+MIGRATION_TIME_BUDGET = float(os.environ.get('MIGRATION_TIME_BUDGET', '20'))
+
+# Campos de metadata que _split_document vuelve a calcular
+_CHUNK_METADATA_KEYS = ("document_id", "chunk_index", "total_chunks")
+
+# Configuración y mapeo del índice de documentos
+_INDEX_BODY = {
+    "settings": {
+        "number_of_shards": 1,
+        "number_of_replicas": 0,
+        "index.knn": True,
+        "refresh_interval": INDEX_REFRESH_INTERVAL,
+        "translog": {
+            "flush_threshold_size": "1gb"
+        },
+        "analysis": {
+            "analyzer": {
+                "spanish_analyzer": {
+                    "tokenizer": "standard",
+                    "filter": ["lowercase", "spanish_stop", "spanish_stemmer"]
+                }
+            },
+            "filter": {
+                "spanish_stop": {
+                    "type": "stop",
+                    "stopwords": "_spanish_"
+                },
+                "spanish_stemmer": {
+                    "type": "stemmer",
+                    "language": "spanish"
+                }
+            }
+        }
+    },
+    "mappings": {
+        "_meta": {
+            "index_version": INDEX_VERSION
+        },
+        # El vector vive en los ficheros k-NN; no duplicarlo como JSON en _source
+        "_source": {
+            "excludes": ["embedding"]
+        },
+        "properties": {
+            "title": {
+                "type": "text",
+                "analyzer": "spanish_analyzer",
+                "fields": {
+                    "keyword": {
+                        "type": "keyword"
+                    }
+                }
+            },
+            "content": {
+                "type": "text",
+                "analyzer": "spanish_analyzer"
+            },
+            "embedding": {
+                "type": "knn_vector",
+                "dimension": EMBEDDING_DIMENSION,
+                "method": {
+                    "name": "hnsw",
+                    "engine": "faiss",
+                    # Vectores normalizados: producto interno == coseno
+                    # (el score de faiss se convierte a [0, 1] en _similarity)
+                    "space_type": "innerproduct"
+                }
+            },
+            "content_hash": {
+                "type": "keyword"
+            },
+            "metadata": {
+                "type": "object",
+                "properties": {
+                    # ID del documento original al que pertenece el chunk
+                    "document_id": {
+                        "type": "keyword"
+                    }
+                }
+            },
+            "created_at": {
+                "type": "date"
+            },
+            "updated_at": {
+                "type": "date"
+            }
+        }
+    }
+}
+
+class OrjsonSerializer(JSONSerializer):
+    """Serializador de OpenSearch basado en orjson (cuerpos _bulk con vectores)"""
+    
+    def dumps(self, data):
+        if isinstance(data, str):
+            return data
+        return orjson.dumps(data, default=self.default).decode()
+    
+    def loads(self, s):
+        return orjson.loads(s)
+
+@lru_cache(maxsize=None)
+def get_opensearch_clients(endpoint: str, username: str, password: str) -> Tuple[OpenSearch, AsyncOpenSearch]:
+    """Clientes OpenSearch (síncrono y async) reutilizables para el endpoint indicado"""
+    # Parámetros de conexión comunes a ambos clientes
+    connection_kwargs = dict(
+        hosts=[{"host": endpoint.replace("https://", "").replace("http://", ""), "port": 443}],
+        http_auth=(username, password),
+        http_compress=True,
+        use_ssl=True,
+        verify_certs=True,
+        ssl_assert_hostname=False,
+        ssl_show_warn=False,
+        serializer=OrjsonSerializer(),
+        timeout=30,  # Aumentar timeout a 30 segundos
+        max_retries=3,  # Máximo 3 reintentos
+        retry_on_timeout=True
+    )
+    
+    # Cliente síncrono (handlers Lambda, indexado bulk)
+    client = OpenSearch(
+        connection_class=RequestsHttpConnection,
+        **connection_kwargs
+    )
+    
+    # Cliente async con pool keep-alive para los endpoints de la API
+    async_client = AsyncOpenSearch(
+        connection_class=AIOHttpConnection,
+        maxsize=50,
+        **connection_kwargs
+    )
+    
+    return client, async_client
 
 class OpenSearchService(ServiceBase):
     def __init__(self):
@@ -24,26 +208,26 @@ class OpenSearchService(ServiceBase):
         self.opensearch_password = config['opensearch_password']
         self.aws_region = config['aws_region']
         
-        # Configurar cliente OpenSearch
-        self.client = OpenSearch(
-            hosts=[{"host": self.opensearch_endpoint.replace("https://", "").replace("http://", ""), "port": 443}],
-            http_auth=(self.opensearch_username, self.opensearch_password),
-            http_compress=True,
-            use_ssl=True,
-            verify_certs=True,
-            ssl_assert_hostname=False,
-            ssl_show_warn=False,
-            connection_class=RequestsHttpConnection,
-            timeout=30,  # Aumentar timeout a 30 segundos
-            max_retries=3,  # Máximo 3 reintentos
-            retry_on_timeout=True
+        # Clientes compartidos por todas las instancias del servicio
+        self.client, self.async_client = get_opensearch_clients(
+            self.opensearch_endpoint,
+            self.opensearch_username,
+            self.opensearch_password
         )
         
         # Configurar Bedrock para embeddings
-        self.bedrock_client = boto3.client("bedrock-runtime", region_name=self.aws_region)
+        # (cliente compartido por todo el contenedor)
+        self.bedrock_client = get_client("bedrock-runtime", self.aws_region)
+        
+        # Nombre del índice (alias) e índice físico con el mapeo vigente
+        self.index_name = INDEX_ALIAS
+        self.physical_index_name = f"{INDEX_ALIAS}-v{INDEX_VERSION}"
+        
+        # Documentos por petición _bulk
+        self.bulk_chunk_size = int(os.environ.get('OPENSEARCH_BULK_CHUNK_SIZE', '500'))
         
-        # Nombre del índice
-        self.index_name = "chatbot-documents"
+        # Agrupador opcional de embeddings (lo asigna la API)
+        self.embedding_batcher = None
         
         # Crear índice si no existe (tanto en local como en Lambda)
         self._create_index_if_not_exists()
@@ -56,64 +240,12 @@ class OpenSearchService(ServiceBase):
                 print(f"Índice {self.index_name} ya existe")
                 return
                 
-            print(f"Creando índice {self.index_name}...")
-            index_body = {
-                    "settings": {
-                        "number_of_shards": 1,
-                        "number_of_replicas": 0,
-                        "analysis": {
-                            "analyzer": {
-                                "spanish_analyzer": {
-                                    "tokenizer": "standard",
-                                    "filter": ["lowercase", "spanish_stop", "spanish_stemmer"]
-                                }
-                            },
-                            "filter": {
-                                "spanish_stop": {
-                                    "type": "stop",
-                                    "stopwords": "_spanish_"
-                                },
-                                "spanish_stemmer": {
-                                    "type": "stemmer",
-                                    "language": "spanish"
-                                }
-                            }
-                        }
-                    },
-                    "mappings": {
-                        "properties": {
-                            "title": {
-                                "type": "text",
-                                "analyzer": "spanish_analyzer",
-                                "fields": {
-                                    "keyword": {
-                                        "type": "keyword"
-                                    }
-                                }
-                            },
-                            "content": {
-                                "type": "text",
-                                "analyzer": "spanish_analyzer"
-                            },
-                            "embedding": {
-                                "type": "dense_vector",
-                                "dims": 1536
-                            },
-                            "metadata": {
-                                "type": "object"
-                            },
-                            "created_at": {
-                                "type": "date"
-                            },
-                            "updated_at": {
-                                "type": "date"
-                            }
-                        }
-                    }
-                }
-            
-            self.client.indices.create(index=self.index_name, body=index_body)
-            print(f"Índice {self.index_name} creado exitosamente")
+            print(f"Creando índice {self.physical_index_name}...")
+            self.client.indices.create(
+                index=self.physical_index_name,
+                body={**_INDEX_BODY, "aliases": {self.index_name: {}}}
+            )
+            print(f"Índice {self.physical_index_name} creado exitosamente")
                 
         except Exception as e:
             print(f"Error creando índice: {str(e)}")
@@ -121,45 +253,300 @@ class OpenSearchService(ServiceBase):
             import traceback
             print(f"Full traceback: {traceback.format_exc()}")
     
-    def _get_embedding_sync(self, text: str) -> List[float]:
-        """Obtener embedding usando Bedrock (versión síncrona)"""
+    def _stored_index_version(self) -> int:
+        """Versión de mapeo (_meta.index_version) del índice al que apunta self.index_name (o None)"""
+        mappings = self.client.indices.get_mapping(index=self.index_name)
+        for index_mapping in mappings.values():
+            return index_mapping['mappings'].get('_meta', {}).get('index_version')
+        return None
+    
+    def migrate_index(self, after: str = None, time_budget: float = MIGRATION_TIME_BUDGET) -> Dict[str, Any]:
+        """Copiar los documentos al índice con el mapeo vigente, por tramos de time_budget segundos
+
+        Cada documento se vuelve a dividir con _split_document (IDs BLAKE2b por chunk,
+        embeddings desde el contenido, que no está en _source con su vector). Con status
+        'in_progress' hay que volver a llamar pasando 'after'; con 'copied' la copia
+        ha terminado y swap_index_alias() pone el índice nuevo en servicio.
+        Lo ya copiado con el mismo content_hash se salta, así que repetir una pasada
+        desde el principio solo reembebe lo que falló.
+        """
+        if self._stored_index_version() == INDEX_VERSION:
+            return {'status': 'up_to_date', 'index': self.physical_index_name}
+        
+        target = self.physical_index_name
+        if not self.client.indices.exists(index=target):
+            # Sin refresco durante la copia; el índice nuevo no se consulta hasta el cambio de alias
+            settings = {**_INDEX_BODY["settings"], "refresh_interval": "-1"}
+            self.client.indices.create(index=target, body={**_INDEX_BODY, "settings": settings})
+        
+        deadline = time.monotonic() + time_budget
+        documents = 0
+        chunks = 0
+        indexed = 0
+        skipped = 0
+        empty = 0
+        errors = []
+        finished = False
+        
+        while time.monotonic() < deadline:
+            body = {
+                "size": MIGRATION_BATCH_SIZE,
+                "query": {"match_all": {}},
+                "sort": [{"_id": "asc"}],
+                "_source": ["title", "content", "metadata", "created_at"]
+            }
+            if after:
+                body["search_after"] = [after]
+            hits = self.client.search(index=self.index_name, body=body)['hits']['hits']
+            if not hits:
+                finished = True
+                break
+            
+            batch = []
+            for hit in hits:
+                source = hit['_source']
+                metadata = {
+                    key: value
+                    for key, value in (source.get('metadata') or {}).items()
+                    if key not in _CHUNK_METADATA_KEYS
+                }
+                _, document_chunks = self._split_document(source.get('title', ''), source.get('content') or '', metadata)
+                # Sin contenido no hay nada que embeber ni recuperar
+                if not document_chunks:
+                    empty += 1
+                for chunk in document_chunks:
+                    chunk['created_at'] = source.get('created_at')
+                batch.extend(document_chunks)
+            documents += len(hits)
+            after = hits[-1]['_id']
+            
+            if batch:
+                result = self.bulk_index_documents(batch, index_name=target)
+                chunks += len(batch)
+                indexed += result['indexed']
+                skipped += result['skipped']
+                errors.extend(result['errors'])
+        
+        return {
+            'status': 'copied' if finished else 'in_progress',
+            'index': target,
+            'after': None if finished else after,
+            'documents': documents,
+            'chunks': chunks,
+            'indexed': indexed,
+            'skipped': skipped,
+            'empty': empty,
+            'errors': errors
+        }
+    
+    def swap_index_alias(self) -> Dict[str, Any]:
+        """Poner en servicio el índice migrado: reactivar su refresco y mover el alias (cambio atómico)
+
+        Las escrituras hechas en el índice antiguo después de copiarlo se pierden.
+        """
+        target = self.physical_index_name
+        if not self.client.indices.exists(index=target):
+            raise ValueError(f"Index {target} does not exist; run migrate_index first")
+        
+        self.client.indices.put_settings(
+            index=target,
+            body={"index": {"refresh_interval": INDEX_REFRESH_INTERVAL}}
+        )
+        self.client.indices.refresh(index=target)
+        
+        # El alias pasa al índice nuevo y desaparece el antiguo
+        if self.client.indices.exists_alias(name=self.index_name):
+            old_indices = [index for index in self.client.indices.get_alias(name=self.index_name) if index != target]
+            actions = [{"remove_index": {"index": index}} for index in old_indices]
+        else:
+            # Índice anterior creado con el nombre del alias
+            actions = [{"remove_index": {"index": self.index_name}}]
+        actions.append({"add": {"index": target, "alias": self.index_name}})
+        self.client.indices.update_aliases(body={"actions": actions})
+        
+        return {'status': 'migrated', 'index': target}
+    
+    def begin_bulk_ingest(self) -> None:
+        """Desactivar el refresco del índice durante una carga masiva"""
+        self.client.indices.put_settings(
+            index=self.index_name,
+            body={"index": {"refresh_interval": "-1"}}
+        )
+    
+    def end_bulk_ingest(self) -> None:
+        """Restaurar el refresco tras una carga masiva y hacer visibles los documentos"""
+        self.client.indices.put_settings(
+            index=self.index_name,
+            body={"index": {"refresh_interval": INDEX_REFRESH_INTERVAL}}
+        )
+        self.client.indices.refresh(index=self.index_name)
+    
+    def _get_embedding_sync(self, text: str, content_hash: str = None) -> List[float]:
+        """Obtener embedding usando Bedrock (versión síncrona, con caché)"""
+        content_hash = content_hash or self._content_hash(text)
+        embedding = self._get_cached_embedding(content_hash)
+        if embedding is not None:
+            return embedding
+        
         try:
             response = self.bedrock_client.invoke_model(
-                modelId="amazon.titan-embed-text-v2:0",
-                body=json.dumps({"inputText": text})
+                modelId=EMBEDDING_MODEL_ID,
+                body=orjson.dumps({"inputText": text})
+            )
+            
+            response_body = orjson.loads(response['body'].read())
+            embedding = response_body['embedding']
+            
+        except Exception as e:
+            raise Exception(f"Error getting embedding: {str(e)}")
+        
+        self._cache_embedding(content_hash, embedding)
+        return embedding
+    
+    async def _get_embedding_async(self, text: str) -> List[float]:
+        """Obtener embedding usando Bedrock (cliente aioboto3 nativo)"""
+        try:
+            client = await get_async_client("bedrock-runtime", self.aws_region)
+            response = await client.invoke_model(
+                modelId=EMBEDDING_MODEL_ID,
+                body=orjson.dumps({"inputText": text})
             )
             
-            response_body = json.loads(response['body'].read())
+            response_body = orjson.loads(await response['body'].read())
             return response_body['embedding']
             
         except Exception as e:
             raise Exception(f"Error getting embedding: {str(e)}")
     
-    async def get_embedding(self, text: str) -> List[float]:
-        """Obtener embedding usando Bedrock"""
-        if self._is_async_context():
-            return await self._run_in_executor(self._get_embedding_sync, text)
+    async def get_embedding(self, text: str, content_hash: str = None) -> List[float]:
+        """Obtener embedding usando Bedrock (con caché)"""
+        content_hash = content_hash or self._content_hash(text)
+        embedding = self._get_cached_embedding(content_hash)
+        if embedding is not None:
+            return embedding
+        
+        if self.embedding_batcher is not None:
+            embedding = await self.embedding_batcher.process(text)
         else:
-            return self._get_embedding_sync(text)
+            embedding = await self._get_embedding_async(text)
+        
+        self._cache_embedding(content_hash, embedding)
+        return embedding
+    
+    async def _embed_many(self, items: List[Tuple[str, str]]) -> List[Union[List[float], BaseException]]:
+        """Embeddings de varios textos ([(texto, hash)]) con concurrencia acotada (los fallos se devuelven en su posición)"""
+        semaphore = asyncio.Semaphore(EMBEDDING_CONCURRENCY)
+        
+        async def embed(text: str, content_hash: str) -> List[float]:
+            embedding = self._get_cached_embedding(content_hash)
+            if embedding is None:
+                async with semaphore:
+                    embedding = await self._get_embedding_async(text)
+                self._cache_embedding(content_hash, embedding)
+            return embedding
+        
+        return await asyncio.gather(
+            *(embed(text, content_hash) for text, content_hash in items),
+            return_exceptions=True
+        )
+    
+    async def _embed_many_once(self, items: List[Tuple[str, str]]) -> List[Union[List[float], BaseException]]:
+        """_embed_many en un event loop efímero (cierra sus clientes aioboto3 al terminar)"""
+        try:
+            return await self._embed_many(items)
+        finally:
+            await close_async_clients()
+    
+    def _content_hash(self, content: str) -> str:
+        """Huella del contenido para detectar documentos sin cambios"""
+        return hashlib.sha256(content.encode()).hexdigest()
+    
+    def _document_id(self, title: str, content: str) -> str:
+        """ID único del documento"""
+        h = hashlib.blake2b(digest_size=16)
+        h.update(title.encode('utf-8'))
+        h.update(content.encode('utf-8'))
+        return h.hexdigest()
+    
+    def _get_cached_embedding(self, content_hash: str) -> List[float]:
+        """Embedding ya calculado para este contenido (o None)"""
+        key = (EMBEDDING_MODEL_ID, content_hash)
+        with _embedding_cache_lock:
+            embedding = _embedding_cache.get(key)
+            if embedding is None:
+                return None
+            _embedding_cache.move_to_end(key)
+        return embedding.tolist()
+    
+    def _cache_embedding(self, content_hash: str, embedding: List[float]) -> None:
+        """Guardar un embedding calculado (LRU acotado)"""
+        key = (EMBEDDING_MODEL_ID, content_hash)
+        with _embedding_cache_lock:
+            _embedding_cache[key] = array('f', embedding)
+            _embedding_cache.move_to_end(key)
+            while len(_embedding_cache) > _EMBEDDING_CACHE_SIZE:
+                _embedding_cache.popitem(last=False)
+    
+    def _get_stored_hashes(self, doc_ids: List[str], index_name: str = None) -> Dict[str, str]:
+        """content_hash guardado en el índice para los IDs indicados ({id: hash})"""
+        if not doc_ids:
+            return {}
+        
+        response = self.client.mget(
+            index=index_name or self.index_name,
+            body={"ids": doc_ids},
+            params={"_source_includes": "content_hash"}
+        )
+        return {
+            doc['_id']: doc['_source'].get('content_hash')
+            for doc in response['docs']
+            if doc.get('found')
+        }
+    
+    async def _get_stored_hash(self, doc_id: str) -> str:
+        """content_hash guardado en el índice para un ID (o None)"""
+        try:
+            response = await self.async_client.get(
+                index=self.index_name,
+                id=doc_id,
+                params={"_source_includes": "content_hash"}
+            )
+            return response['_source'].get('content_hash')
+        except NotFoundError:
+            return None
+    
+    def _build_document(self, title: str, content: str, metadata: Dict[str, Any] = None, embedding: List[float] = None, now_iso: str = None, doc_id: str = None) -> Tuple[str, Dict[str, Any]]:
+        """Construir ID y cuerpo del documento (incluye el embedding)"""
+        # Generar ID único
+        doc_id = doc_id or self._document_id(title, content)
+        content_hash = self._content_hash(content)
+        
+        # Obtener embedding si no se ha calculado ya
+        if embedding is None:
+            embedding = self._get_embedding_sync(content, content_hash)
+        
+        # Preparar documento
+        doc_body = {
+            "title": title,
+            "content": content,
+            "content_hash": content_hash,
+            "embedding": embedding,
+            "metadata": metadata or {},
+            # updated_at solo se escribe al actualizar (si falta, equivale a created_at)
+            "created_at": now_iso or datetime.now().isoformat()
+        }
+        
+        return doc_id, doc_body
     
     def _index_document_sync(self, title: str, content: str, metadata: Dict[str, Any] = None) -> Dict[str, Any]:
         """Indexar documento (versión síncrona)"""
         try:
-            # Generar ID único
-            doc_id = hashlib.md5(f"{title}{content}".encode()).hexdigest()
+            # Documento sin cambios: no recalcular embedding ni reescribir
+            doc_id = self._document_id(title, content)
+            if self._get_stored_hashes([doc_id]).get(doc_id) == self._content_hash(content):
+                return {'_id': doc_id, 'result': 'noop'}
             
-            # Obtener embedding
-            embedding = self._get_embedding_sync(content)
-            
-            # Preparar documento
-            doc_body = {
-                "title": title,
-                "content": content,
-                "embedding": embedding,
-                "metadata": metadata or {},
-                "created_at": datetime.now().isoformat(),
-                "updated_at": datetime.now().isoformat()
-            }
+            doc_id, doc_body = self._build_document(title, content, metadata)
             
             # Indexar documento
             response = self.client.index(
@@ -173,48 +560,268 @@ class OpenSearchService(ServiceBase):
         except Exception as e:
             raise Exception(f"Error indexing document: {str(e)}")
     
-    async def index_document(self, title: str, content: str, metadata: Dict[str, Any] = None) -> Dict[str, Any]:
+    def bulk_index_documents(self, documents: List[Dict[str, Any]], index_name: str = None) -> Dict[str, Any]:
+        """Indexar varios documentos ({title, content, metadata, id y created_at opcionales}) con peticiones _bulk
+
+        Es bloqueante y abre su propio event loop: desde código async hay que llamarlo
+        con self._run_in_executor(...).
+        """
+        index_name = index_name or self.index_name
+        try:
+            doc_ids = [
+                document.get('id') or self._document_id(document['title'], document['content'])
+                for document in documents
+            ]
+            content_hashes = [self._content_hash(document['content']) for document in documents]
+            
+            # Saltar los documentos que ya están indexados con el mismo contenido
+            stored_hashes = self._get_stored_hashes(list(set(doc_ids)), index_name)
+            pending = [
+                (document, doc_id, content_hash)
+                for document, doc_id, content_hash in zip(documents, doc_ids, content_hashes)
+                if stored_hashes.get(doc_id) != content_hash
+            ]
+            
+            # Embeddings concurrentes en un solo hilo con aioboto3
+            items = [(document['content'], content_hash) for document, _, content_hash in pending]
+            embeddings = asyncio.run(self._embed_many_once(items))
+            
+            # Un embedding fallido solo descarta su documento (se informa como error de _bulk)
+            errors = []
+            embedded = []
+            for (document, doc_id, _), embedding in zip(pending, embeddings):
+                if isinstance(embedding, BaseException):
+                    errors.append({"index": {"_index": index_name, "_id": doc_id, "error": str(embedding)}})
+                else:
+                    embedded.append((document, doc_id, embedding))
+            
+            # Misma marca de tiempo para todo el lote
+            now_iso = datetime.now().isoformat()
+            
+            def actions():
+                """Acciones _bulk generadas bajo demanda (el pool consume a su ritmo)"""
+                for document, doc_id, embedding in embedded:
+                    doc_id, doc_body = self._build_document(
+                        document['title'],
+                        document['content'],
+                        document.get('metadata'),
+                        # Solo reduce el JSON enviado; las consultas usan el vector completo
+                        [round(value, EMBEDDING_BULK_DECIMALS) for value in embedding],
+                        document.get('created_at') or now_iso,
+                        doc_id
+                    )
+                    yield {
+                        "_op_type": "index",
+                        "_index": index_name,
+                        "_id": doc_id,
+                        "_source": doc_body
+                    }
+            
+            indexed, bulk_errors = self._parallel_bulk(actions())
+            errors.extend(bulk_errors)
+            
+            return {
+                'document_ids': doc_ids,
+                'indexed': indexed,
+                'skipped': len(documents) - len(pending),
+                'errors': errors
+            }
+            
+        except Exception as e:
+            raise Exception(f"Error bulk indexing documents: {str(e)}")
+    
+    def _parallel_bulk(self, actions: Iterator[Dict[str, Any]]) -> Tuple[int, List[Dict[str, Any]]]:
+        """Enviar las acciones en varios lotes _bulk concurrentes, con backpressure sobre el generador"""
+        # helpers.parallel_bulk usa multiprocessing.pool.ThreadPool, que necesita
+        # semáforos POSIX (/dev/shm) y falla en Lambda; se usa un ThreadPoolExecutor
+        indexed = 0
+        errors = []
+        
+        def collect(done) -> None:
+            nonlocal indexed
+            for future in done:
+                success, failed = future.result()
+                indexed += success
+                errors.extend(failed)
+        
+        with ThreadPoolExecutor(max_workers=BULK_THREAD_COUNT, thread_name_prefix='bulk') as executor:
+            in_flight = set()
+            while True:
+                batch = list(islice(actions, self.bulk_chunk_size))
+                if not batch:
+                    break
+                
+                # Como mucho BULK_THREAD_COUNT + BULK_QUEUE_SIZE lotes en memoria
+                if len(in_flight) >= BULK_THREAD_COUNT + BULK_QUEUE_SIZE:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    collect(done)
+                
+                in_flight.add(executor.submit(
+                    helpers.bulk,
+                    self.client,
+                    batch,
+                    chunk_size=self.bulk_chunk_size,
+                    max_chunk_bytes=50 * 1024 * 1024,
+                    raise_on_error=False,
+                    request_timeout=60
+                ))
+            
+            collect(wait(in_flight).done)
+        
+        return indexed, errors
+    
+    async def index_document(self, title: str, content: str, metadata: Dict[str, Any] = None, doc_id: str = None) -> Dict[str, Any]:
         """Indexar documento"""
-        if self._is_async_context():
-            return await self._run_in_executor(self._index_document_sync, title, content, metadata)
-        else:
-            return self._index_document_sync(title, content, metadata)
+        try:
+            # Documento sin cambios: no recalcular embedding ni reescribir
+            doc_id = doc_id or self._document_id(title, content)
+            content_hash = self._content_hash(content)
+            if await self._get_stored_hash(doc_id) == content_hash:
+                return {'_id': doc_id, 'result': 'noop'}
+            
+            embedding = await self.get_embedding(content, content_hash)
+            doc_id, doc_body = self._build_document(title, content, metadata, embedding, doc_id=doc_id)
+            
+            return await self.async_client.index(
+                index=self.index_name,
+                id=doc_id,
+                body=doc_body
+            )
+            
+        except Exception as e:
+            raise Exception(f"Error indexing document: {str(e)}")
     
-    async def search_documents(self, query: str, max_results: int = 10) -> List[Dict[str, Any]]:
-        """Buscar documentos usando búsqueda semántica y de texto"""
+    def _split_document(self, title: str, content: str, metadata: Dict[str, Any] = None) -> Tuple[str, List[Dict[str, Any]]]:
+        """Dividir un documento en chunks indexables, cada uno con el ID del documento original"""
+        document_id = self._document_id(title, content)
+        # Un documento vacío (o solo espacios) no produce chunks
+        pieces = split_text(content, CHUNK_SIZE, CHUNK_OVERLAP)
+        
+        chunks = []
+        for i, piece in enumerate(pieces):
+            chunks.append({
+                "id": f"{document_id}-{i}",
+                "title": title,
+                "content": piece,
+                "metadata": {
+                    **(metadata or {}),
+                    "document_id": document_id,
+                    "chunk_index": i,
+                    "total_chunks": len(pieces)
+                }
+            })
+        
+        return document_id, chunks
+    
+    def index_chunked_documents(self, documents: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Dividir documentos ({title, content, metadata}) en chunks e indexarlos con _bulk"""
+        document_ids = []
+        chunks = []
+        for document in documents:
+            document_id, document_chunks = self._split_document(
+                document['title'],
+                document['content'],
+                document.get('metadata')
+            )
+            document_ids.append(document_id)
+            chunks.extend(document_chunks)
+        
+        # Solo las cargas grandes compensan desactivar el refresco (2 put_settings + refresh)
+        bulk_ingest = len(chunks) >= BULK_INGEST_MIN_CHUNKS
+        if bulk_ingest:
+            self.begin_bulk_ingest()
+        try:
+            result = self.bulk_index_documents(chunks)
+        finally:
+            if bulk_ingest:
+                self.end_bulk_ingest()
+        
+        # Errores por documento original ({document_id: error})
+        failed = {
+            document_id: 'Empty document'
+            for document_id, document in zip(document_ids, documents)
+            if not document['content'].strip()
+        }
+        for error in result['errors']:
+            info = next(iter(error.values()))
+            failed.setdefault(info.get('_id', '').rsplit('-', 1)[0], info.get('error'))
+        
+        return {
+            'document_ids': document_ids,
+            'chunks': len(chunks),
+            'indexed': result['indexed'],
+            'skipped': result['skipped'],
+            'errors': result['errors'],
+            'failed': failed
+        }
+    
+    async def index_chunked_document(self, title: str, content: str, metadata: Dict[str, Any] = None) -> Dict[str, Any]:
+        """Dividir un documento en chunks e indexarlos (mismo camino _bulk que las cargas por lotes)"""
         try:
-            # Para búsqueda por texto no necesitamos embedding por ahora
-            # query_embedding = await self.get_embedding(query)
+            # Embeddings con concurrencia acotada y un _bulk por lote de chunks, fuera del event loop
+            result = await self._run_in_executor(
+                self.index_chunked_documents,
+                [{'title': title, 'content': content, 'metadata': metadata}]
+            )
+            document_id = result['document_ids'][0]
+            if document_id in result['failed']:
+                raise ValueError(result['failed'][document_id])
             
-            # Búsqueda simplificada solo por texto
-            search_body = {
-                "size": max_results,
-                "query": {
-                    "multi_match": {
-                        "query": query,
-                        "fields": ["title^2", "content"],
-                        "type": "best_fields",
-                        "fuzziness": "AUTO"
+            return {'_id': document_id, 'chunks': result['chunks']}
+            
+        except Exception as e:
+            raise Exception(f"Error indexing document: {str(e)}")
+    
+    def _build_search_body(self, query_embedding: List[float], max_results: int) -> Dict[str, Any]:
+        """Construir el cuerpo de búsqueda semántica (k-NN sobre el embedding)"""
+        return {
+            "size": max_results,
+            # No contar todos los documentos coincidentes, solo necesitamos los top-k
+            "track_total_hits": False,
+            "query": {
+                "knn": {
+                    "embedding": {
+                        "vector": query_embedding,
+                        "k": max_results
                     }
-                },
-                "_source": ["title", "content", "metadata", "created_at"]
-            }
+                }
+            },
+            "_source": ["title", "content", "metadata", "created_at"]
+        }
+    
+    def _similarity(self, score: float) -> float:
+        """Convertir el score k-NN de faiss (innerproduct) en similitud coseno en [0, 1]
+
+        faiss puntúa 1 + ip si ip >= 0 y 1 / (1 - ip) si ip < 0, así que todo
+        hit relevante quedaría entre 1 y 2.
+        """
+        return min(max(score - 1.0, 0.0), 1.0)
+    
+    def _parse_search_hits(self, response: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Procesar los hits de una respuesta de búsqueda"""
+        results = []
+        for hit in response['hits']['hits']:
+            results.append({
+                "id": hit['_id'],
+                "title": hit['_source']['title'],
+                "content": hit['_source']['content'],
+                "metadata": hit['_source']['metadata'],
+                "score": self._similarity(hit['_score']),
+                "created_at": hit['_source']['created_at']
+            })
+        
+        return results
+    
+    async def search_documents(self, query: str, max_results: int = 10) -> List[Dict[str, Any]]:
+        """Buscar documentos usando búsqueda semántica (k-NN)"""
+        try:
+            query_embedding = await self.get_embedding(query)
+            search_body = self._build_search_body(query_embedding, max_results)
             
-            response = self.client.search(index=self.index_name, body=search_body)
+            response = await self.async_client.search(index=self.index_name, body=search_body)
             
             # Procesar resultados
-            results = []
-            for hit in response['hits']['hits']:
-                results.append({
-                    "id": hit['_id'],
-                    "title": hit['_source']['title'],
-                    "content": hit['_source']['content'],
-                    "metadata": hit['_source']['metadata'],
-                    "score": hit['_score'],
-                    "created_at": hit['_source']['created_at']
-                })
-            
-            return results
+            return self._parse_search_hits(response)
             
         except Exception as e:
             # Si el índice no existe, intentar crearlo
@@ -228,16 +835,70 @@ class OpenSearchService(ServiceBase):
                     print(f"Error creando índice: {create_error}")
             raise Exception(f"Error searching documents: {str(e)}")
     
+    def _format_async_search(self, response: Dict[str, Any]) -> Dict[str, Any]:
+        """Normalizar la respuesta del plugin de búsqueda asíncrona"""
+        result = {
+            "id": response.get("id"),
+            "state": response.get("state"),
+            "results": []
+        }
+        if "response" in response:
+            result["results"] = self._parse_search_hits(response["response"])
+        
+        return result
+    
+    async def submit_async_search(self, query: str, max_results: int = 10) -> Dict[str, Any]:
+        """Lanzar una búsqueda asíncrona (plugin _asynchronous_search)"""
+        try:
+            response = await self.async_client.transport.perform_request(
+                "POST",
+                "/_plugins/_asynchronous_search",
+                params={
+                    "index": self.index_name,
+                    "wait_for_completion_timeout": "2s",
+                    "keep_on_completion": "true"
+                },
+                body=self._build_search_body(await self.get_embedding(query), max_results)
+            )
+            return self._format_async_search(response)
+            
+        except Exception as e:
+            raise Exception(f"Error submitting async search: {str(e)}")
+    
+    async def get_async_search(self, search_id: str) -> Dict[str, Any]:
+        """Obtener el estado/resultados de una búsqueda asíncrona"""
+        try:
+            response = await self.async_client.transport.perform_request(
+                "GET",
+                f"/_plugins/_asynchronous_search/{search_id}"
+            )
+            return self._format_async_search(response)
+            
+        except Exception as e:
+            raise Exception(f"Error getting async search: {str(e)}")
+    
+    async def delete_async_search(self, search_id: str) -> Dict[str, Any]:
+        """Eliminar una búsqueda asíncrona"""
+        try:
+            return await self.async_client.transport.perform_request(
+                "DELETE",
+                f"/_plugins/_asynchronous_search/{search_id}"
+            )
+            
+        except Exception as e:
+            raise Exception(f"Error deleting async search: {str(e)}")
+    
     async def list_documents(self, size: int = 100) -> List[Dict[str, Any]]:
         """Listar todos los documentos"""
         try:
             search_body = {
                 "size": size,
+                "track_total_hits": False,
                 "query": {"match_all": {}},
                 "_source": ["title", "content", "metadata", "created_at", "updated_at"]
             }
             
-            response = self.client.search(index=self.index_name, body=search_body)
+            response = await self.async_client.search(index=self.index_name, body=search_body)
             
             documents = []
             for hit in response['hits']['hits']:
@@ -247,7 +908,7 @@ class OpenSearchService(ServiceBase):
                     "content": hit['_source']['content'],
                     "metadata": hit['_source']['metadata'],
                     "created_at": hit['_source']['created_at'],
-                    "updated_at": hit['_source']['updated_at']
+                    "updated_at": hit['_source'].get('updated_at', hit['_source']['created_at'])
                 })
             
             return documents
@@ -256,9 +917,21 @@ class OpenSearchService(ServiceBase):
             raise Exception(f"Error listing documents: {str(e)}")
     
     async def delete_document(self, document_id: str) -> Dict[str, Any]:
-        """Eliminar documento"""
+        """Eliminar documento (y todos sus chunks)"""
         try:
-            response = self.client.delete(index=self.index_name, id=document_id)
+            response = await self.async_client.delete_by_query(
+                index=self.index_name,
+                body={
+                    "query": {
+                        "bool": {
+                            "should": [
+                                {"ids": {"values": [document_id]}},
+                                {"term": {"metadata.document_id": document_id}}
+                            ]
+                        }
+                    }
+                }
+            )
             return response
             
         except Exception as e:
@@ -277,14 +950,26 @@ class OpenSearchService(ServiceBase):
                 update_body["doc"]["title"] = title
             
             if content:
+                content_hash = self._content_hash(content)
                 update_body["doc"]["content"] = content
-                # Actualizar embedding también
-                update_body["doc"]["embedding"] = await self.get_embedding(content)
+                update_body["doc"]["content_hash"] = content_hash
+            else:
+                # El embedding no está en _source: una actualización parcial lo perdería si no se reenvía
+                stored = await self.async_client.get(
+                    index=self.index_name,
+                    id=document_id,
+                    params={"_source_includes": "content,content_hash"}
+                )
+                content = stored['_source']['content']
+                content_hash = stored['_source'].get('content_hash')
+            
+            # Actualizar embedding también
+            update_body["doc"]["embedding"] = await self.get_embedding(content, content_hash)
             
             if metadata:
                 update_body["doc"]["metadata"] = metadata
             
-            response = self.client.update(
+            response = await self.async_client.update(
                 index=self.index_name,
                 id=document_id,
                 body=update_body
@@ -295,6 +980,10 @@ class OpenSearchService(ServiceBase):
         except Exception as e:
             raise Exception(f"Error updating document: {str(e)}")
     
+    async def close(self) -> None:
+        """Cerrar el pool de conexiones del cliente async"""
+        await self.async_client.close()
+    
     def get_index_stats(self) -> Dict[str, Any]:
         """Obtener estadísticas del índice"""
         try:
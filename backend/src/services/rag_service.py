@@ -1,15 +1,48 @@
-import boto3
-import json
 import os
-from typing import List, Dict, Any
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+import string
+from statistics import fmean
+from typing import List, Dict, Any, AsyncIterator
 from langchain.embeddings import BedrockEmbeddings
-from langchain_aws import ChatBedrockConverse
 from datetime import datetime
 
 # Importar utilidades
 from src.core.utils.environment import get_environment_config, is_lambda_environment
 from src.core.utils.service_base import ServiceBase
+from src.core.utils.text_splitter import split_text
+from src.core.utils.aws_clients import get_async_client, get_client
+
+# Modelo de chat (Claude 3 Haiku por defecto, el más económico)
+LLM_MODEL_ID = os.environ.get('BEDROCK_LLM_MODEL_ID', 'anthropic.claude-3-haiku-20240307-v1:0')
+
+# Modelos con prompt caching en Bedrock (Claude 3 Haiku no lo soporta)
+_PROMPT_CACHE_MODELS = ('claude-3-5-haiku', 'claude-3-7-sonnet', 'claude-sonnet-4', 'claude-opus-4', 'amazon.nova-')
+
+# Punto de caché de Bedrock: todo lo anterior se reutiliza si el prefijo es idéntico
+_CACHE_POINT = {"cachePoint": {"type": "default"}}
+
+# Instrucciones fijas del sistema (deben ser idénticas byte a byte para acertar en la caché)
+INSTRUCTIONS = """Eres un asistente inteligente especializado en AWS y tecnologías de nube.
+
+Instrucciones:
+1. Si encuentras información relevante en el contexto, responde basándote en ella y cita las fuentes
+2. Si NO encuentras información específica en el contexto:
+   - Reconoce que no tienes esa información específica en tus documentos
+   - Si es sobre tecnología de nube/AWS, proporciona una respuesta general útil
+   - Sugiere temas relacionados que sí puedes responder basándote en tus documentos
+3. Mantén un tono profesional y amigable
+4. Sé claro y conciso en tu respuesta
+5. Si la pregunta es sobre AWS o tecnologías relacionadas, puedes usar conocimiento general"""
+
+# Bloque de contexto (antes del segundo punto de caché) y bloque variable de la pregunta
+_CONTEXT_TEMPLATE = string.Template("""Contexto de documentos disponibles:
+$context""")
+
+_PROMPT_TEMPLATE = string.Template("""$history_header
+$history
+
+Pregunta del usuario: $question
+
+Respuesta:""")
 
 class RAGService(ServiceBase):
     def __init__(self):
@@ -19,7 +52,7 @@ class RAGService(ServiceBase):
         config = get_environment_config()
         self.aws_region = config['aws_region']
         
-        self.bedrock_client = boto3.client("bedrock-runtime", region_name=self.aws_region)
+        self.bedrock_client = get_client("bedrock-runtime", self.aws_region)
         
         # Configurar embeddings
         self.embeddings = BedrockEmbeddings(
@@ -27,21 +60,13 @@ class RAGService(ServiceBase):
             model_id="amazon.titan-embed-text-v2:0"
         )
         
-        # Configurar LLM - usando Claude 3 Haiku (más económico)
-        self.llm = ChatBedrockConverse(
-            model_id="anthropic.claude-3-haiku-20240307-v1:0"
-            # model_kwargs se pasan directamente como parámetros
-            # max_tokens=1000,
-            # temperature=0.7,
-            # top_p=0.9
-        )
+        # LLM - usando Claude 3 Haiku (más económico) vía Converse con el cliente aioboto3
+        self.llm_model_id = LLM_MODEL_ID
+        self.prompt_caching = any(model in LLM_MODEL_ID for model in _PROMPT_CACHE_MODELS)
         
         # Configurar text splitter
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,
-            chunk_overlap=200,
-            length_function=len
-        )
+        self.chunk_size = 1000
+        self.chunk_overlap = 200
     
     async def generate_response(
         self, 
@@ -53,17 +78,11 @@ class RAGService(ServiceBase):
         Generar respuesta usando RAG
         """
         try:
-            # Preparar contexto
-            context = self._prepare_context(context_documents)
-            
-            # Preparar historial de chat
-            history_context = self._prepare_chat_history(chat_history or [])
-            
-            # Crear prompt
-            prompt = self._create_prompt(question, context, history_context)
+            # Crear petición para el LLM
+            request = self._prepare_request(question, context_documents, chat_history)
             
             # Generar respuesta
-            response = await self._generate_llm_response(prompt)
+            response = await self._generate_llm_response(request)
             
             # Calcular confianza basada en la relevancia de los documentos
             confidence = self._calculate_confidence(context_documents)
@@ -81,6 +100,35 @@ class RAGService(ServiceBase):
         except Exception as e:
             raise Exception(f"Error generating RAG response: {str(e)}")
     
+    async def generate_response_stream(
+        self,
+        question: str,
+        context_documents: List[Dict[str, Any]],
+        chat_history: List[Dict[str, str]] = None
+    ) -> AsyncIterator[str]:
+        """
+        Generar respuesta usando RAG, emitiendo el texto a medida que llega
+        """
+        request = self._prepare_request(question, context_documents, chat_history)
+        async for delta in self._stream_llm_response(request):
+            yield delta
+    
+    def _prepare_request(
+        self,
+        question: str,
+        context_documents: List[Dict[str, Any]],
+        chat_history: List[Dict[str, str]] = None
+    ) -> Dict[str, Any]:
+        """Preparar contexto e historial y crear la petición al LLM"""
+        # Preparar contexto
+        context = self._prepare_context(context_documents)
+        
+        # Preparar historial de chat
+        history_context = self._prepare_chat_history(chat_history or [])
+        
+        # Crear prompt
+        return self._create_prompt(question, context, history_context)
+    
     def _prepare_context(self, documents: List[Dict[str, Any]]) -> str:
         """Preparar contexto de documentos"""
         context_parts = []
@@ -104,58 +152,53 @@ class RAGService(ServiceBase):
         
         return "\n".join(history_parts)
     
-    def _create_prompt(self, question: str, context: str, history: str) -> str:
-        """Crear prompt para el LLM"""
-        prompt = f"""
-Eres un asistente inteligente especializado en AWS y tecnologías de nube.
-
-{"Historial de conversación:" if history else ""}
-{history}
-
-Contexto de documentos disponibles:
-{context}
-
-Pregunta del usuario: {question}
-
-Instrucciones:
-1. Si encuentras información relevante en el contexto, responde basándote en ella y cita las fuentes
-2. Si NO encuentras información específica en el contexto:
-   - Reconoce que no tienes esa información específica en tus documentos
-   - Si es sobre tecnología de nube/AWS, proporciona una respuesta general útil
-   - Sugiere temas relacionados que sí puedes responder basándote en tus documentos
-3. Mantén un tono profesional y amigable
-4. Sé claro y conciso en tu respuesta
-5. Si la pregunta es sobre AWS o tecnologías relacionadas, puedes usar conocimiento general
-
-Respuesta:
-"""
-        return prompt
+    def _create_prompt(self, question: str, context: str, history: str) -> Dict[str, Any]:
+        """Crear la petición Converse (prefijo estable antes de los puntos de caché)"""
+        system = [{"text": INSTRUCTIONS}]
+        context_content = [{"text": _CONTEXT_TEMPLATE.substitute(context=context)}]
+        if self.prompt_caching:
+            system.append(_CACHE_POINT)
+            context_content.append(_CACHE_POINT)
+        
+        question_text = _PROMPT_TEMPLATE.substitute(
+            history_header="Historial de conversación:" if history else "",
+            history=history,
+            question=question
+        )
+        
+        return {
+            "system": system,
+            "messages": [
+                {"role": "user", "content": context_content + [{"text": question_text}]}
+            ]
+        }
     
-    async def _generate_llm_response(self, prompt: str) -> str:
-        """Generar respuesta del LLM usando ChatBedrockConverse"""
+    async def _stream_llm_response(self, request: Dict[str, Any]) -> AsyncIterator[str]:
+        """Emitir los fragmentos de texto del LLM (ConverseStream nativo async)"""
         try:
-            # Usar la nueva API de mensajes
-            messages = [
-                ("human", prompt)
-            ]
-            
-            # Llamada síncrona (ChatBedrockConverse no tiene versión async nativa)
-            response = self.llm.invoke(messages)
+            client = await get_async_client("bedrock-runtime", self.aws_region)
+            response = await client.converse_stream(modelId=self.llm_model_id, **request)
             
-            # Extraer contenido de la respuesta
-            return response.content
+            async for event in response['stream']:
+                if 'contentBlockDelta' in event:
+                    text = event['contentBlockDelta']['delta'].get('text')
+                    if text:
+                        yield text
             
         except Exception as e:
             raise Exception(f"Error calling Bedrock: {str(e)}")
     
+    async def _generate_llm_response(self, request: Dict[str, Any]) -> str:
+        """Generar respuesta completa del LLM"""
+        return ''.join([delta async for delta in self._stream_llm_response(request)])
+    
     def _calculate_confidence(self, documents: List[Dict[str, Any]]) -> float:
         """Calcular confianza basada en scores de documentos"""
         if not documents:
             return 0.0
         
         # Calcular confianza promedio basada en scores
-        total_score = sum(doc.get("score", 0) for doc in documents)
-        avg_score = total_score / len(documents)
+        avg_score = fmean(doc.get("score", 0) for doc in documents)
         
         # Normalizar a 0-1
         confidence = min(avg_score, 1.0)
@@ -176,7 +219,7 @@ Respuesta:
     
     def process_document(self, content: str, metadata: Dict[str, Any] = None) -> List[Dict[str, Any]]:
         """Procesar documento en chunks"""
-        chunks = self.text_splitter.split_text(content)
+        chunks = split_text(content, self.chunk_size, self.chunk_overlap)
         
         processed_chunks = []
         for i, chunk in enumerate(chunks):
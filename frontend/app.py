@@ -1,9 +1,14 @@
 import streamlit as st
-import requests
-import json
+import httpx
+import asyncio
+import copy
+import gzip
+import threading
+import orjson
 import os
+from collections import OrderedDict
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, AsyncIterator, Optional, Tuple
 import time
 from dotenv import load_dotenv
 
@@ -43,60 +48,227 @@ st.markdown("""
         padding: 1rem;
         margin: 0.5rem 0;
     }
-    .confidence-high { color: #4caf50; font-weight: bold; }
-    .confidence-medium { color: #ff9800; font-weight: bold; }
-    .confidence-low { color: #f44336; font-weight: bold; }
 </style>
 """, unsafe_allow_html=True)
 
 # Configuración de la API
 BACKEND_URL = os.getenv("BACKEND_URL", "https://smuzri8cak.execute-api.us-east-1.amazonaws.com/Prod")
 
+# Cuerpos de petición a partir de este tamaño se envían comprimidos
+GZIP_MIN_BYTES = 4096
+
+# Turnos (pregunta + respuesta) de historial que se envían al backend
+MAX_HISTORY_TURNS = 6
+
+# Respuestas completas memoizadas: vigencia (s) y número máximo de entradas
+RESPONSE_CACHE_TTL = 600
+RESPONSE_CACHE_SIZE = 256
+
+@st.cache_resource
+def _get_loop() -> asyncio.AbstractEventLoop:
+    """Event loop persistente en un hilo de fondo (el pool del cliente async queda ligado a él)"""
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    return loop
+
+def run_async(coro):
+    """Ejecutar una corrutina en el loop compartido y esperar su resultado"""
+    return asyncio.run_coroutine_threadsafe(coro, _get_loop()).result()
+
+@st.cache_resource
+def get_http() -> httpx.AsyncClient:
+    """Cliente HTTP/2 async con pool keep-alive compartido entre reruns y sesiones"""
+    limits = httpx.Limits(max_keepalive_connections=10, max_connections=20, keepalive_expiry=30.0)
+    return httpx.AsyncClient(
+        transport=httpx.AsyncHTTPTransport(http2=True, limits=limits, retries=3),
+        timeout=httpx.Timeout(30.0, connect=5.0)
+    )
+
+def _payload_json(message: str, chat_history: List[Dict[str, str]]) -> bytes:
+    """Cuerpo de /chat serializado de forma canónica (sirve también de clave de caché)"""
+    return orjson.dumps({
+        "message": message,
+        "chat_history": chat_history or [],
+        "max_results": 5
+    }, option=orjson.OPT_SORT_KEYS)
+
+def _json_body(body: bytes) -> Dict[str, Any]:
+    """Argumentos content/headers para un cuerpo JSON (comprimido con gzip si supera GZIP_MIN_BYTES)"""
+    if len(body) <= GZIP_MIN_BYTES:
+        return {"content": body, "headers": {"Content-Type": "application/json"}}
+    return {
+        "content": gzip.compress(body, compresslevel=6),
+        "headers": {"Content-Type": "application/json", "Content-Encoding": "gzip"}
+    }
+
+class ResponseCache:
+    """Respuestas completas ({message, sources, confidence}) por (url, payload), con TTL y LRU"""
+    
+    def __init__(self, ttl: float = RESPONSE_CACHE_TTL, max_entries: int = RESPONSE_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, bytes], Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, url: str, payload_json: bytes) -> Optional[Dict[str, Any]]:
+        """Copia de la respuesta guardada (o None si no hay o ha caducado)"""
+        key = (url, payload_json)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, response = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+        # El llamador añade campos de presentación a las fuentes
+        return copy.deepcopy(response)
+    
+    def put(self, url: str, payload_json: bytes, response: Dict[str, Any]) -> None:
+        """Guardar una respuesta completa"""
+        key = (url, payload_json)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, copy.deepcopy(response))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+@st.cache_resource
+def get_response_cache() -> ResponseCache:
+    """Caché de respuestas compartida entre reruns y sesiones"""
+    return ResponseCache()
+
+async def _parse_sse(lines: AsyncIterator[str]) -> AsyncIterator[Tuple[str, Any]]:
+    """Convertir líneas SSE en pares (evento, datos JSON); sin línea event: el evento es delta"""
+    event = None
+    async for line in lines:
+        if line.startswith("event:"):
+            event = line[6:].strip()
+        elif line.startswith("data:"):
+            yield event or "delta", orjson.loads(line[5:])
+        elif not line:
+            event = None
+
 class ChatbotInterface:
     def __init__(self):
         self.backend_url = BACKEND_URL
+        self.client = get_http()
+        
+    async def _stream_events(self, payload_json: bytes) -> AsyncIterator[Tuple[str, Any]]:
+        """Leer los eventos SSE de /chat/stream como pares (evento, datos)"""
+        async with self.client.stream(
+            "POST",
+            f"{self.backend_url}/chat/stream",
+            **_json_body(payload_json)
+        ) as response:
+            response.raise_for_status()
+            async for item in _parse_sse(response.aiter_lines()):
+                yield item
+    
+    def send_message_stream(self, message: str, chat_history: List[Dict[str, str]], result: Dict[str, Any], use_cache: bool = True) -> Iterator[str]:
+        """Enviar mensaje al backend y emitir la respuesta por fragmentos (SSE); fuentes y confianza quedan en result
+
+        Las respuestas completas se memorizan al llegar el evento done; con use_cache
+        una pregunta repetida (mismo mensaje e historial) se responde sin llamar al backend.
+        """
+        payload_json = _payload_json(message, chat_history)
+        cache = get_response_cache()
+        cached = cache.get(self.backend_url, payload_json) if use_cache else None
+        if cached is not None:
+            result.update(cached)
+            yield cached["message"]
+            return
+        
+        result.update({"sources": [], "confidence": 0.0})
+        events = self._stream_events(payload_json)
+        deltas = []
         
-    def send_message(self, message: str, chat_history: List[Dict[str, str]] = None) -> Dict[str, Any]:
-        """Enviar mensaje al backend"""
         try:
-            payload = {
-                "message": message,
-                "chat_history": chat_history or [],
-                "max_results": 5
-            }
-            
-            response = requests.post(
-                f"{self.backend_url}/chat",
-                json=payload,
-                timeout=30
-            )
-            
-            if response.status_code == 200:
-                return response.json()
-            else:
-                st.error(f"Error del servidor: {response.status_code}")
-                return {"message": "Error al procesar la solicitud", "sources": [], "confidence": 0.0}
+            while True:
+                try:
+                    event, data = run_async(events.__anext__())
+                except StopAsyncIteration:
+                    return
                 
-        except requests.exceptions.RequestException as e:
+                if event == "done":
+                    result.update(data)
+                    # Solo se memorizan las respuestas completas
+                    cache.put(self.backend_url, payload_json, {**data, "message": "".join(deltas)})
+                elif event == "error":
+                    st.error(f"Error del servidor: {data.get('message')}")
+                else:
+                    deltas.append(data["delta"])
+                    yield data["delta"]
+                    
+        except httpx.HTTPStatusError as e:
+            st.error(f"Error del servidor: {e.response.status_code}")
+            yield "Error al procesar la solicitud"
+        except httpx.HTTPError as e:
             st.error(f"Error de conexión: {str(e)}")
-            return {"message": "Error de conexión con el servidor", "sources": [], "confidence": 0.0}
-    
-    def check_backend_status(self) -> bool:
-        """Verificar si el backend está disponible"""
-        try:
-            response = requests.get(f"{self.backend_url}/health", timeout=5)
-            return response.status_code == 200
-        except:
-            return False
-    
-    def get_confidence_color(self, confidence: float) -> str:
-        """Obtener clase CSS basada en la confianza"""
-        if confidence >= 0.7:
-            return "confidence-high"
-        elif confidence >= 0.4:
-            return "confidence-medium"
-        else:
-            return "confidence-low"
+            yield "Error de conexión con el servidor"
+        finally:
+            run_async(events.aclose())
+
+@st.cache_resource
+def get_chatbot() -> ChatbotInterface:
+    """Instancia compartida entre reruns"""
+    return ChatbotInterface()
+
+def render_confidence(confidence: float) -> None:
+    """Mostrar la confianza con una barra nativa (sin HTML)"""
+    st.progress(min(max(confidence, 0.0), 1.0), text=f"🎯 Confianza: {confidence:.1%}")
+
+async def _probe_async(url: str) -> Dict[str, Optional[bool]]:
+    """Consultar en paralelo la API y la conexión con OpenSearch
+
+    /opensearch-test solo existe en el handler de Lambda: si la API responde 404
+    (FastAPI en local) el estado de OpenSearch queda como desconocido (None).
+    """
+    client = get_http()
+    health, opensearch = await asyncio.gather(
+        client.get(f"{url}/health", timeout=5),
+        client.get(f"{url}/opensearch-test", timeout=5),
+        return_exceptions=True
+    )
+    backend = not isinstance(health, BaseException) and health.status_code == 200
+    if isinstance(opensearch, BaseException):
+        opensearch_ok = False
+    elif opensearch.status_code == 404:
+        opensearch_ok = None
+    else:
+        opensearch_ok = opensearch.status_code == 200
+    return {"backend": backend, "opensearch": opensearch_ok}
+
+@st.cache_data(ttl=15, show_spinner=False)
+def _probe(url: str) -> Dict[str, Optional[bool]]:
+    """Verificar si el backend está disponible (como mucho una vez cada 15 s por URL)"""
+    return run_async(_probe_async(url))
+
+def render_sources(sources: List[Dict[str, Any]]) -> None:
+    """Mostrar las fuentes ya formateadas (_label, _preview, _pretty)"""
+    st.markdown("**📚 Fuentes:**")
+    for source in sources:
+        with st.expander(source['_label']):
+            st.write(source['_preview'])
+            if source.get('_pretty'):
+                st.code(source['_pretty'], language="json")
+
+def render_history(show_confidence: bool, show_sources: bool) -> None:
+    """Historial del chat (las fuentes llegan ya formateadas; no se recalcula nada por mensaje)"""
+    for message in st.session_state.messages:
+        with st.chat_message(message["role"]):
+            st.write(message["content"])
+            
+            # Mostrar metadata para respuestas del asistente
+            if message["role"] == "assistant" and "metadata" in message:
+                metadata = message["metadata"]
+                
+                if show_confidence and "confidence" in metadata:
+                    render_confidence(metadata["confidence"])
+                
+                if show_sources and "sources" in metadata and metadata["sources"]:
+                    render_sources(metadata["sources"])
 
 def main():
     # Título simple
@@ -105,10 +277,11 @@ def main():
     st.markdown("---")
     
     # Inicializar chatbot
-    chatbot = ChatbotInterface()
+    chatbot = get_chatbot()
     
     # Verificar estado del backend
-    backend_status = chatbot.check_backend_status()
+    status = _probe(BACKEND_URL)
+    backend_status = status["backend"]
     
     # Sidebar simple
     with st.sidebar:
@@ -119,6 +292,16 @@ def main():
             st.success("✅ Sistema conectado")
         else:
             st.error("❌ Sistema desconectado")
+        if backend_status and status["opensearch"] is False:
+            st.warning("⚠️ Base de conocimiento no disponible")
+        
+        # Forzar una nueva comprobación del backend
+        if st.button("🔄 Reconectar"):
+            _probe.clear()
+            st.rerun()
+        
+        # Consultar siempre el backend aunque la pregunta ya tenga respuesta memorizada
+        force_refresh = st.toggle("Forzar actualización", help="Ignora las respuestas en caché")
         
         # Configuraciones básicas
         show_confidence = st.checkbox("Mostrar confianza", value=True)
@@ -129,42 +312,18 @@ def main():
         # Botón para limpiar chat
         if st.button("🗑️ Limpiar Chat"):
             st.session_state.messages = []
+            st.session_state.user_msg_count = 0
             st.rerun()
         
-        # Estadísticas básicas
-        if 'messages' in st.session_state:
-            total_messages = len([msg for msg in st.session_state.messages if msg["role"] == "user"])
-            st.metric("Consultas realizadas", total_messages)
+        # Estadísticas básicas (contador mantenido al agregar mensajes)
+        st.metric("Consultas realizadas", st.session_state.setdefault("user_msg_count", 0))
     
     # Inicializar mensajes si no existen
     if "messages" not in st.session_state:
         st.session_state.messages = []
     
     # Mostrar mensajes usando st.chat_message (más limpio)
-    for message in st.session_state.messages:
-        with st.chat_message(message["role"]):
-            st.write(message["content"])
-            
-            # Mostrar metadata para respuestas del asistente
-            if message["role"] == "assistant" and "metadata" in message:
-                metadata = message["metadata"]
-                
-                if show_confidence and "confidence" in metadata:
-                    confidence = metadata["confidence"]
-                    confidence_class = chatbot.get_confidence_color(confidence)
-                    st.markdown(f'<p class="{confidence_class}">🎯 Confianza: {confidence:.1%}</p>', unsafe_allow_html=True)
-                
-                if show_sources and "sources" in metadata and metadata["sources"]:
-                    st.markdown("**📚 Fuentes:**")
-                    for i, source in enumerate(metadata["sources"], 1):
-                        score = source.get('score', 0)
-                        title = source.get('title', 'Sin título')
-                        preview = source.get('content_preview', 'Sin vista previa')
-                        
-                        with st.expander(f"{i}. {title} (Score: {score:.3f})"):
-                            st.write(preview)
-                            if source.get('metadata'):
-                                st.json(source['metadata'])
+    render_history(show_confidence, show_sources)
     
     # Input de chat
     if prompt := st.chat_input("Escribe tu pregunta aquí..."):
@@ -174,46 +333,45 @@ def main():
         
         # Agregar mensaje del usuario
         st.session_state.messages.append({"role": "user", "content": prompt})
+        st.session_state.user_msg_count += 1
         
         with st.chat_message("user"):
             st.write(prompt)
         
         # Generar respuesta
         with st.chat_message("assistant"):
-            with st.spinner("Pensando..."):
-                # Preparar historial para enviar al backend
-                chat_history = []
-                for msg in st.session_state.messages[:-1]:  # Excluir el mensaje actual
-                    if msg["role"] == "user":
-                        chat_history.append({"role": "human", "content": msg["content"]})
-                    elif msg["role"] == "assistant":
-                        chat_history.append({"role": "assistant", "content": msg["content"]})
-                
-                # Obtener respuesta del chatbot
-                response = chatbot.send_message(prompt, chat_history)
-                st.write(response["message"])
-                
-                # Mostrar confianza
-                if show_confidence:
-                    confidence = response["confidence"]
-                    confidence_class = chatbot.get_confidence_color(confidence)
-                    st.markdown(f'<p class="{confidence_class}">🎯 Confianza: {confidence:.1%}</p>', unsafe_allow_html=True)
-                
-                # Mostrar fuentes
-                if show_sources and response.get("sources"):
-                    st.markdown("**📚 Fuentes:**")
-                    for i, source in enumerate(response["sources"], 1):
-                        score = source.get('score', 0)
-                        title = source.get('title', 'Sin título')
-                        preview = source.get('content_preview', 'Sin vista previa')
-                        
-                        with st.expander(f"{i}. {title} (Score: {score:.3f})"):
-                            st.write(preview)
-                            if source.get('metadata'):
-                                st.json(source['metadata'])
+            # Preparar historial para enviar al backend (solo los últimos turnos, sin el mensaje actual)
+            recent = st.session_state.messages[-(2 * MAX_HISTORY_TURNS + 1):-1]
+            chat_history = []
+            for msg in recent:
+                if msg["role"] == "user":
+                    chat_history.append({"role": "human", "content": msg["content"]})
+                elif msg["role"] == "assistant":
+                    chat_history.append({"role": "assistant", "content": msg["content"]})
+            
+            # Mostrar la respuesta a medida que llega
+            response = {}
+            response["message"] = st.write_stream(
+                chatbot.send_message_stream(prompt, chat_history, response, use_cache=not force_refresh)
+            )
+            
+            # Formatear las fuentes una sola vez (el historial las reutiliza)
+            for i, source in enumerate(response.get("sources", []), 1):
+                source['_label'] = f"{i}. {source.get('title', 'Sin título')} (Score: {source.get('score', 0):.3f})"
+                source['_preview'] = (source.get('content_preview') or '').strip() or 'Sin vista previa'
+                if source.get('metadata'):
+                    source['_pretty'] = orjson.dumps(source['metadata'], option=orjson.OPT_INDENT_2).decode()
+            
+            # Mostrar confianza
+            if show_confidence:
+                render_confidence(response["confidence"])
+            
+            # Mostrar fuentes
+            if show_sources and response.get("sources"):
+                render_sources(response["sources"])
         
         # Guardar respuesta del asistente con metadata
-        st.session_state.messages.append({
+        assistant_message = {
             "role": "assistant",
             "content": response["message"],
             "metadata": {
@@ -221,7 +379,8 @@ def main():
                 "sources": response.get("sources", []),
                 "timestamp": response.get("timestamp")
             }
-        })
+        }
+        st.session_state.messages.append(assistant_message)
 
 if __name__ == "__main__":
     main()
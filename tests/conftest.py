@@ -1,9 +1,9 @@
-import pytest
-import sys
 import os
-
-# Add the parent directory to the Python path
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import httpx
+import pytest
+import pytest_asyncio
+import requests
+from requests.adapters import HTTPAdapter
 
 # Test configuration
 pytest_plugins = []
@@ -19,3 +19,24 @@ def test_config():
             "content": "This is a test document for the RAG chatbot system."
         }
     }
+
+@pytest.fixture(scope="session")
+def http():
+    """Pooled HTTP session shared by all tests (one TCP+TLS handshake per connection)"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=20, pool_maxsize=20, max_retries=3)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    yield session
+    session.close()
+
+@pytest_asyncio.fixture(scope="session", loop_scope="session")
+async def async_http():
+    """Shared HTTP/2 async client for concurrent endpoint checks"""
+    async with httpx.AsyncClient(
+        base_url=os.getenv("API_GATEWAY_URL", "http://localhost:8000"),
+        limits=httpx.Limits(max_keepalive_connections=20),
+        http2=True,
+        timeout=30
+    ) as client:
+        yield client
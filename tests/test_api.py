@@ -1,8 +1,42 @@
+import asyncio
 import pytest
-import requests
-import json
+import orjson
 import os
 
+# (method, path, JSON body, query params, expected keys -> type or exact value)
+ENDPOINT_CASES = [
+    ("GET", "/health", None, None, {"status": "healthy"}),
+    ("POST", "/chat", {"message": "Hello, this is a test message", "max_results": 5}, None,
+     {"message": str, "sources": list, "confidence": float, "timestamp": str}),
+    ("GET", "/documents", None, None, {"documents": list}),
+    ("GET", "/search", None, {"query": "AWS", "max_results": 5}, {"results": list}),
+]
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_endpoints_concurrently(async_http):
+    """Hit the read-only endpoints concurrently over one shared client"""
+    results = await asyncio.gather(*(
+        async_http.request(
+            method,
+            path,
+            content=orjson.dumps(body) if body is not None else None,
+            params=params,
+            headers={"Content-Type": "application/json"} if body is not None else None
+        )
+        for method, path, body, params, _ in ENDPOINT_CASES
+    ), return_exceptions=True)
+    
+    for (method, path, _, _, expected), response in zip(ENDPOINT_CASES, results):
+        assert not isinstance(response, BaseException), f"{method} {path}: {response!r}"
+        assert response.status_code == 200, f"{method} {path}: {response.status_code}"
+        data = orjson.loads(response.content)
+        for key, check in expected.items():
+            assert key in data, f"{method} {path}: missing {key}"
+            if isinstance(check, type):
+                assert isinstance(data[key], check), f"{method} {path}: {key} is not {check.__name__}"
+            else:
+                assert data[key] == check, f"{method} {path}: {key} == {data[key]!r}"
+
 class TestChatbotAPI:
     """Test suite for the chatbot API endpoints"""
     
@@ -12,36 +46,31 @@ class TestChatbotAPI:
         self.config = test_config
         self.base_url = os.getenv("API_GATEWAY_URL", "http://localhost:8000")
         
-    def test_health_endpoint(self):
-        """Test the health check endpoint"""
-        response = requests.get(f"{self.base_url}/health")
-        assert response.status_code == 200
-        data = response.json()
-        assert "status" in data
-        assert data["status"] == "healthy"
-    
-    def test_chat_endpoint(self):
-        """Test the chat endpoint"""
+    def test_chat_endpoint_with_history(self, http):
+        """Test chat endpoint with conversation history"""
         payload = {
-            "message": self.config["test_message"],
-            "max_results": 5
+            "message": "What is AWS?",
+            "chat_history": [
+                {"role": "user", "content": "Hello"},
+                {"role": "assistant", "content": "Hello! How can I help you?"}
+            ],
+            "max_results": 3
         }
         
-        response = requests.post(
+        response = http.post(
             f"{self.base_url}/chat",
-            json=payload,
+            data=orjson.dumps(payload),
             headers={"Content-Type": "application/json"}
         )
         
         assert response.status_code == 200
-        data = response.json()
+        data = orjson.loads(response.content)
         assert "message" in data
-        assert "sources" in data
-        assert "confidence" in data
-        assert "timestamp" in data
+        assert isinstance(data["sources"], list)
+        assert isinstance(data["confidence"], float)
     
-    def test_chat_endpoint_with_history(self):
-        """Test chat endpoint with conversation history"""
+    def test_chat_stream_with_history(self, http):
+        """Test the streaming chat endpoint with conversation history"""
         payload = {
             "message": "What is AWS?",
             "chat_history": [
@@ -51,19 +80,18 @@ class TestChatbotAPI:
             "max_results": 3
         }
         
-        response = requests.post(
-            f"{self.base_url}/chat",
-            json=payload,
+        response = http.post(
+            f"{self.base_url}/chat/stream",
+            data=orjson.dumps(payload),
             headers={"Content-Type": "application/json"}
         )
         
         assert response.status_code == 200
-        data = response.json()
-        assert "message" in data
-        assert isinstance(data["sources"], list)
-        assert isinstance(data["confidence"], float)
+        events = [line[6:].strip() for line in response.text.splitlines() if line.startswith("event:")]
+        assert "error" not in events
+        assert events[-1] == "done"
     
-    def test_upload_document(self):
+    def test_upload_document(self, http):
         """Test document upload endpoint"""
         payload = {
             "title": self.config["test_document"]["title"],
@@ -71,67 +99,44 @@ class TestChatbotAPI:
             "metadata": {"test": True}
         }
         
-        response = requests.post(
+        response = http.post(
             f"{self.base_url}/documents/upload",
-            json=payload,
+            data=orjson.dumps(payload),
             headers={"Content-Type": "application/json"}
         )
         
         assert response.status_code == 200
-        data = response.json()
+        data = orjson.loads(response.content)
         assert "message" in data
         assert "document_id" in data
     
-    def test_list_documents(self):
-        """Test list documents endpoint"""
-        response = requests.get(f"{self.base_url}/documents")
-        
-        assert response.status_code == 200
-        data = response.json()
-        assert "documents" in data
-        assert isinstance(data["documents"], list)
-    
-    def test_search_documents(self):
-        """Test document search endpoint"""
-        params = {
-            "query": "AWS",
-            "max_results": 5
-        }
-        
-        response = requests.get(f"{self.base_url}/search", params=params)
-        
-        assert response.status_code == 200
-        data = response.json()
-        assert "results" in data
-        assert isinstance(data["results"], list)
-    
-    def test_invalid_chat_request(self):
+    def test_invalid_chat_request(self, http):
         """Test chat endpoint with invalid request"""
         payload = {}  # Missing required message field
         
-        response = requests.post(
+        response = http.post(
             f"{self.base_url}/chat",
-            json=payload,
+            data=orjson.dumps(payload),
             headers={"Content-Type": "application/json"}
         )
         
         assert response.status_code == 400
-        data = response.json()
+        data = orjson.loads(response.content)
         assert "error" in data
     
-    def test_invalid_document_upload(self):
+    def test_invalid_document_upload(self, http):
         """Test document upload with invalid data"""
         payload = {
             "title": "Test",
             # Missing content field
         }
         
-        response = requests.post(
+        response = http.post(
             f"{self.base_url}/documents/upload",
-            json=payload,
+            data=orjson.dumps(payload),
             headers={"Content-Type": "application/json"}
         )
         
         assert response.status_code == 400
-        data = response.json()
+        data = orjson.loads(response.content)
         assert "error" in data
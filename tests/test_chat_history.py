@@ -0,0 +1,39 @@
+from src.models.chat_models import ChatRequest
+from src.services.rag_service import RAGService
+
+def _rag_service():
+    """RAGService without AWS clients (only the prompt helpers are used)"""
+    return RAGService.__new__(RAGService)
+
+def test_request_history_is_plain_dicts():
+    """The pydantic history is converted to the dicts RAGService expects"""
+    request = ChatRequest.model_validate({
+        "message": "What is AWS?",
+        "chat_history": [
+            {"role": "user", "content": "Hello"},
+            {"role": "assistant", "content": "Hello! How can I help you?"}
+        ]
+    })
+    history = request.history()
+    assert [(message["role"], message["content"]) for message in history] == [
+        ("user", "Hello"),
+        ("assistant", "Hello! How can I help you?")
+    ]
+
+def test_request_without_history():
+    """A request without history yields an empty list"""
+    assert ChatRequest(message="Hi").history() == []
+    assert ChatRequest(message="Hi", chat_history=None).history() == []
+
+def test_history_reaches_the_prompt():
+    """A non-empty history from a request is rendered into the prompt history"""
+    request = ChatRequest.model_validate({
+        "message": "And S3?",
+        "chat_history": [
+            {"role": "user", "content": "What is EC2?"},
+            {"role": "assistant", "content": "A compute service."}
+        ]
+    })
+    assert _rag_service()._prepare_chat_history(request.history()) == (
+        "User: What is EC2?\nAssistant: A compute service."
+    )
@@ -0,0 +1,139 @@
+import asyncio
+from collections import OrderedDict
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.services import opensearch_service as opensearch_module
+from src.services.opensearch_service import OpenSearchService, CHUNK_SIZE
+
+LONG_TEXT = " ".join(f"Sentence number {i} explains how the RAG pipeline indexes documents." for i in range(400))
+
+@pytest.fixture
+def bulk_calls(monkeypatch):
+    """Record every _bulk request sent through helpers.bulk"""
+    calls = []
+
+    def fake_bulk(client, actions, **kwargs):
+        calls.append([action["_id"] for action in actions])
+        return len(actions), []
+
+    monkeypatch.setattr(opensearch_module.helpers, "bulk", fake_bulk)
+    return calls
+
+@pytest.fixture
+def service(monkeypatch):
+    """OpenSearchService with a fake cluster and fake Bedrock embeddings"""
+    monkeypatch.setattr(opensearch_module, "_embedding_cache", OrderedDict())
+    service = OpenSearchService.__new__(OpenSearchService)
+    service.client = MagicMock()
+    service.client.mget.return_value = {"docs": []}
+    service.index_name = "test-index"
+    service.bulk_chunk_size = 500
+    service.embedded = []
+
+    async def fake_embedding(text):
+        service.embedded.append(text)
+        return [0.1, 0.2, 0.3]
+
+    service._get_embedding_async = fake_embedding
+    return service
+
+def test_index_chunked_document_sends_one_bulk_request(service, bulk_calls):
+    """A long upload is embedded chunk by chunk but written with a single _bulk request"""
+    result = asyncio.run(service.index_chunked_document("Guide", LONG_TEXT, {"source": "upload"}))
+
+    assert result["chunks"] > 10
+    assert len(bulk_calls) == 1
+    assert len(bulk_calls[0]) == result["chunks"]
+    assert all(doc_id.startswith(f"{result['_id']}-") for doc_id in bulk_calls[0])
+    assert all(len(text) <= CHUNK_SIZE for text in service.embedded)
+
+def test_index_chunked_document_does_not_index_one_by_one(service, bulk_calls):
+    """No per-chunk index requests are made"""
+    asyncio.run(service.index_chunked_document("Guide", LONG_TEXT))
+    service.client.index.assert_not_called()
+
+def test_index_chunked_document_rejects_empty_document(service, bulk_calls):
+    """An empty document raises and sends nothing"""
+    with pytest.raises(Exception, match="Empty document"):
+        asyncio.run(service.index_chunked_document("Empty", "   "))
+    assert bulk_calls == []
+
+def test_small_ingest_keeps_refresh_interval(service, bulk_calls):
+    """Loads below BULK_INGEST_MIN_CHUNKS do not touch the index settings"""
+    service.index_chunked_documents([{"title": "Guide", "content": LONG_TEXT}])
+    service.client.indices.put_settings.assert_not_called()
+
+def test_large_ingest_restores_refresh_interval_on_failure(service, monkeypatch):
+    """The ingest that disabled refresh re-enables it even when _bulk fails"""
+    monkeypatch.setattr(opensearch_module, "BULK_INGEST_MIN_CHUNKS", 1)
+
+    def failing_bulk(client, actions, **kwargs):
+        raise RuntimeError("cluster unavailable")
+
+    monkeypatch.setattr(opensearch_module.helpers, "bulk", failing_bulk)
+    with pytest.raises(Exception, match="cluster unavailable"):
+        service.index_chunked_documents([{"title": "Guide", "content": LONG_TEXT}])
+
+    intervals = [call.kwargs["body"]["index"]["refresh_interval"] for call in service.client.indices.put_settings.call_args_list]
+    assert intervals == ["-1", opensearch_module.INDEX_REFRESH_INTERVAL]
+
+def test_existing_index_startup_does_not_touch_settings(service):
+    """Service construction on an existing index does not read or reset the refresh interval"""
+    service.client.indices.exists.return_value = True
+    service._create_index_if_not_exists()
+    service.client.indices.get_settings.assert_not_called()
+    service.client.indices.put_settings.assert_not_called()
+
+def test_split_document_chunk_ids_are_deterministic(service):
+    """Chunk ids are <document_id>-<index> and do not change between runs"""
+    document_id, chunks = service._split_document("Guide", LONG_TEXT, {"source": "upload"})
+
+    assert document_id == service._document_id("Guide", LONG_TEXT)
+    assert [chunk["id"] for chunk in chunks] == [f"{document_id}-{i}" for i in range(len(chunks))]
+    assert all(chunk["metadata"]["total_chunks"] == len(chunks) for chunk in chunks)
+    assert all(chunk["metadata"]["source"] == "upload" for chunk in chunks)
+    assert service._split_document("Guide", LONG_TEXT, {"source": "upload"}) == (document_id, chunks)
+
+def test_split_document_id_depends_on_title_and_content(service):
+    """Same content under another title is a different document"""
+    assert service._split_document("A", "Same text.")[0] != service._split_document("B", "Same text.")[0]
+    assert service._split_document("A", "Same text.")[0] != service._split_document("A", "Other text.")[0]
+
+def test_failed_chunks_are_reported_by_document(service, monkeypatch):
+    """A failed chunk marks its original document as failed, keyed by document id"""
+    _, chunks = service._split_document("Broken", LONG_TEXT)
+    failed_chunk = chunks[1]["id"]
+
+    def partial_bulk(client, actions, **kwargs):
+        errors = [{"index": {"_id": action["_id"], "error": "mapper_parsing_exception"}} for action in actions if action["_id"] == failed_chunk]
+        return len(actions) - len(errors), errors
+
+    monkeypatch.setattr(opensearch_module.helpers, "bulk", partial_bulk)
+    result = service.index_chunked_documents([
+        {"title": "Broken", "content": LONG_TEXT},
+        {"title": "Fine", "content": "A short document."},
+        {"title": "Blank", "content": "  "}
+    ])
+
+    broken_id, fine_id, blank_id = result["document_ids"]
+    assert result["failed"] == {broken_id: "mapper_parsing_exception", blank_id: "Empty document"}
+    assert fine_id not in result["failed"]
+
+def test_failed_embedding_is_reported_by_document(service, bulk_calls):
+    """An embedding error drops only that document's chunk and surfaces as its failure"""
+    async def failing_embedding(text):
+        if "Bedrock" in text:
+            raise RuntimeError("ThrottlingException")
+        return [0.1, 0.2, 0.3]
+
+    service._get_embedding_async = failing_embedding
+    result = service.index_chunked_documents([
+        {"title": "Throttled", "content": "Bedrock rejected this one."},
+        {"title": "Fine", "content": "A short document."}
+    ])
+
+    throttled_id, fine_id = result["document_ids"]
+    assert result["failed"] == {throttled_id: "ThrottlingException"}
+    assert bulk_calls == [[f"{fine_id}-0"]]
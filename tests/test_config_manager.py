@@ -0,0 +1,74 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.core.utils import config_manager as config_module
+from src.core.utils.config_manager import ConfigManager
+
+class FakeClock:
+    """Controllable replacement for time.monotonic"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(config_module.time, "monotonic", fake)
+    return fake
+
+@pytest.fixture
+def manager(monkeypatch):
+    monkeypatch.setenv("SSM_CACHE_TTL", "60")
+    manager = ConfigManager()
+    manager.ssm_client = MagicMock()
+    manager.ssm_client.get_parameter.side_effect = lambda Name, WithDecryption: {
+        "Parameter": {"Name": Name, "Value": f"value-of-{Name}"}
+    }
+    manager.ssm_client.get_parameters.side_effect = lambda Names, WithDecryption: {
+        "Parameters": [{"Name": name, "Value": f"value-of-{name}"} for name in Names if "missing" not in name],
+        "InvalidParameters": [name for name in Names if "missing" in name]
+    }
+    return manager
+
+def test_get_parameter_is_cached_within_ttl(manager, clock):
+    """A second read inside the TTL does not call SSM"""
+    assert manager.get_parameter("opensearch/endpoint") == "value-of-/chatbot/dev/opensearch/endpoint"
+    clock.now += 59
+    manager.get_parameter("opensearch/endpoint")
+    assert manager.ssm_client.get_parameter.call_count == 1
+
+def test_get_parameter_expires_after_ttl(manager, clock):
+    """A read after the TTL goes back to SSM"""
+    manager.get_parameter("opensearch/endpoint")
+    clock.now += 61
+    manager.get_parameter("opensearch/endpoint")
+    assert manager.ssm_client.get_parameter.call_count == 2
+
+def test_get_parameters_only_fetches_uncached(manager, clock):
+    """Batch reads reuse cached values and only request the rest"""
+    manager.get_parameter("vpc/id")
+    values = manager.get_parameters(["vpc/id", "vpc/subnet_ids"])
+    assert values == {
+        "vpc/id": "value-of-/chatbot/dev/vpc/id",
+        "vpc/subnet_ids": "value-of-/chatbot/dev/vpc/subnet_ids"
+    }
+    manager.ssm_client.get_parameters.assert_called_once_with(
+        Names=["/chatbot/dev/vpc/subnet_ids"], WithDecryption=False
+    )
+
+def test_get_parameters_batches_by_ten(manager, clock):
+    """GetParameters is called with at most 10 names per request"""
+    names = [f"app/param{i}" for i in range(23)]
+    manager.get_parameters(names)
+    sizes = [len(call.kwargs["Names"]) for call in manager.ssm_client.get_parameters.call_args_list]
+    assert sizes == [10, 10, 3]
+
+def test_get_parameters_missing_values_are_none_and_not_cached(manager, clock):
+    """Missing parameters come back as None and are requested again next time"""
+    assert manager.get_parameters(["missing/param"]) == {"missing/param": None}
+    manager.get_parameters(["missing/param"])
+    assert manager.ssm_client.get_parameters.call_count == 2
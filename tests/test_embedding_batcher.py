@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+
+from src.services.embedding_batcher import EmbeddingBatcher
+
+class FakeEmbedder:
+    """Records every text sent to the embedding model"""
+
+    def __init__(self, delay: float = 0):
+        self.calls = []
+        self.delay = delay
+
+    async def __call__(self, text):
+        self.calls.append(text)
+        await asyncio.sleep(self.delay)
+        if text == "fail":
+            raise ValueError("bedrock error")
+        return [float(len(text))]
+
+def test_concurrent_identical_texts_are_embedded_once():
+    """Requests arriving within the window share one model call per distinct text"""
+    embed = FakeEmbedder()
+
+    async def scenario():
+        batcher = EmbeddingBatcher(embed, max_wait_ms=5)
+        results = await asyncio.gather(*(batcher.process(text) for text in ["aws", "aws", "rag", "aws"]))
+        await batcher.stop()
+        return results
+
+    assert asyncio.run(scenario()) == [[3.0], [3.0], [3.0], [3.0]]
+    assert sorted(embed.calls) == ["aws", "rag"]
+
+def test_window_groups_requests_arriving_shortly_after():
+    """A request queued a moment later still joins the open batch"""
+    embed = FakeEmbedder()
+
+    async def scenario():
+        batcher = EmbeddingBatcher(embed, max_wait_ms=50)
+        first = asyncio.ensure_future(batcher.process("same"))
+        await asyncio.sleep(0.01)
+        second = asyncio.ensure_future(batcher.process("same"))
+        results = await asyncio.gather(first, second)
+        await batcher.stop()
+        return results
+
+    assert asyncio.run(scenario()) == [[4.0], [4.0]]
+    assert embed.calls == ["same"]
+
+def test_errors_are_delivered_to_their_own_request():
+    """A failing text raises only for its callers"""
+    embed = FakeEmbedder()
+
+    async def scenario():
+        batcher = EmbeddingBatcher(embed, max_wait_ms=5)
+        results = await asyncio.gather(batcher.process("ok"), batcher.process("fail"), return_exceptions=True)
+        await batcher.stop()
+        return results
+
+    ok, failed = asyncio.run(scenario())
+    assert ok == [2.0]
+    assert isinstance(failed, ValueError)
+
+def test_stop_fails_pending_requests():
+    """Requests still in flight when the batcher stops get an error instead of hanging"""
+    embed = FakeEmbedder(delay=10)
+
+    async def scenario():
+        batcher = EmbeddingBatcher(embed, max_wait_ms=5)
+        pending = asyncio.ensure_future(batcher.process("slow"))
+        await asyncio.sleep(0.05)
+        await batcher.stop()
+        return await asyncio.wait_for(pending, 1)
+
+    with pytest.raises(RuntimeError, match="stopped"):
+        asyncio.run(scenario())
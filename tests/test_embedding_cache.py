@@ -0,0 +1,56 @@
+import asyncio
+from collections import OrderedDict
+
+import pytest
+
+from src.services import opensearch_service as opensearch_module
+from src.services.opensearch_service import OpenSearchService
+
+@pytest.fixture
+def service(monkeypatch):
+    """OpenSearchService with an empty, small embedding cache and a counting fake model"""
+    monkeypatch.setattr(opensearch_module, "_embedding_cache", OrderedDict())
+    monkeypatch.setattr(opensearch_module, "_EMBEDDING_CACHE_SIZE", 3)
+    service = OpenSearchService.__new__(OpenSearchService)
+    service.embedding_batcher = None
+    service.embedded = []
+
+    async def fake_embedding(text):
+        service.embedded.append(text)
+        return [0.5, 0.25]
+
+    service._get_embedding_async = fake_embedding
+    return service
+
+def test_cached_embedding_round_trip(service):
+    """A stored embedding comes back as a list of floats"""
+    service._cache_embedding("h1", [0.5, 0.25])
+    assert service._get_cached_embedding("h1") == [0.5, 0.25]
+    assert service._get_cached_embedding("missing") is None
+
+def test_cache_evicts_least_recently_used(service):
+    """Beyond _EMBEDDING_CACHE_SIZE the least recently read entry is dropped"""
+    for content_hash in ("h1", "h2", "h3"):
+        service._cache_embedding(content_hash, [1.0])
+    service._get_cached_embedding("h1")
+    service._cache_embedding("h4", [1.0])
+
+    assert service._get_cached_embedding("h2") is None
+    assert all(service._get_cached_embedding(h) is not None for h in ("h1", "h3", "h4"))
+    assert len(opensearch_module._embedding_cache) == 3
+
+def test_cache_is_keyed_by_model(service, monkeypatch):
+    """Embeddings from another model are not reused"""
+    service._cache_embedding("h1", [1.0])
+    monkeypatch.setattr(opensearch_module, "EMBEDDING_MODEL_ID", "amazon.titan-embed-text-v1")
+    assert service._get_cached_embedding("h1") is None
+
+def test_get_embedding_calls_model_once_per_text(service):
+    """Repeated lookups of the same text hit the cache"""
+    async def scenario():
+        first = await service.get_embedding("What is AWS?")
+        second = await service.get_embedding("What is AWS?")
+        return first, second
+
+    assert asyncio.run(scenario()) == ([0.5, 0.25], [0.5, 0.25])
+    assert service.embedded == ["What is AWS?"]
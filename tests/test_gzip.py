@@ -0,0 +1,101 @@
+import asyncio
+import gzip
+
+import orjson
+import pytest
+
+from src.core.utils.compression import gunzip_limited, PayloadTooLargeError
+from src.api import middleware
+from src.api.middleware import GzipRequestMiddleware
+
+def test_gunzip_round_trip():
+    """A valid gzip body is decompressed unchanged"""
+    body = orjson.dumps({"message": "hola " * 1000})
+    assert gunzip_limited(gzip.compress(body)) == body
+
+def test_gunzip_multiple_members():
+    """Concatenated gzip members are decompressed in order"""
+    assert gunzip_limited(gzip.compress(b"abc") + gzip.compress(b"def")) == b"abcdef"
+
+def test_gunzip_exact_limit_is_allowed():
+    """Output exactly at max_size is accepted"""
+    assert gunzip_limited(gzip.compress(b"x" * 10), max_size=10) == b"x" * 10
+
+def test_gunzip_bomb_is_rejected():
+    """Output above max_size raises PayloadTooLargeError without inflating it all"""
+    bomb = gzip.compress(b"\0" * (50 * 1024 * 1024))
+    with pytest.raises(PayloadTooLargeError):
+        gunzip_limited(bomb, max_size=1024)
+
+@pytest.mark.parametrize("data", [b"not gzip", gzip.compress(b"truncated body")[:-6]])
+def test_gunzip_invalid_body(data):
+    """Invalid or truncated gzip raises ValueError (not PayloadTooLargeError)"""
+    with pytest.raises(ValueError) as excinfo:
+        gunzip_limited(data)
+    assert not isinstance(excinfo.value, PayloadTooLargeError)
+
+def _run_middleware(body: bytes, headers, chunk_size: int = 1024):
+    """Send body through GzipRequestMiddleware; return (status, received body, received headers)"""
+    seen = {}
+    sent = []
+
+    async def app(scope, receive, send):
+        message = await receive()
+        seen["body"] = message["body"]
+        seen["headers"] = dict(scope["headers"])
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    chunks = [body[i:i + chunk_size] for i in range(0, len(body), chunk_size)] or [b""]
+    messages = [
+        {"type": "http.request", "body": chunk, "more_body": i < len(chunks) - 1}
+        for i, chunk in enumerate(chunks)
+    ]
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "POST", "path": "/chat", "headers": headers}
+    asyncio.run(GzipRequestMiddleware(app)(scope, receive, send))
+    return sent[0]["status"], seen.get("body"), seen.get("headers")
+
+def test_middleware_decompresses_body():
+    """Gzip bodies reach the app decompressed, without Content-Encoding"""
+    body = orjson.dumps({"message": "hola " * 2000})
+    status, received, headers = _run_middleware(
+        gzip.compress(body),
+        [(b"content-type", b"application/json"), (b"content-encoding", b"gzip")]
+    )
+    assert status == 200
+    assert received == body
+    assert b"content-encoding" not in headers
+    assert headers[b"content-length"] == str(len(body)).encode()
+
+def test_middleware_passes_through_plain_bodies():
+    """Bodies without Content-Encoding: gzip are not touched"""
+    status, received, _ = _run_middleware(b'{"message": "hola"}', [(b"content-type", b"application/json")])
+    assert status == 200
+    assert received == b'{"message": "hola"}'
+
+def test_middleware_rejects_invalid_gzip():
+    """A malformed gzip body is a 400, not a 500"""
+    status, received, _ = _run_middleware(b"not gzip", [(b"content-encoding", b"gzip")])
+    assert status == 400
+    assert received is None
+
+def test_middleware_rejects_gzip_bomb(monkeypatch):
+    """A body that inflates past the limit is a 413"""
+    monkeypatch.setattr(middleware, "gunzip_limited", lambda data: gunzip_limited(data, max_size=1024))
+    status, received, _ = _run_middleware(gzip.compress(b"\0" * 1024 * 1024), [(b"content-encoding", b"gzip")])
+    assert status == 413
+    assert received is None
+
+def test_middleware_rejects_oversized_compressed_body(monkeypatch):
+    """The compressed body itself is capped before decompressing"""
+    monkeypatch.setattr(middleware, "MAX_DECOMPRESSED_SIZE", 1024)
+    status, received, _ = _run_middleware(b"\x1f\x8b" + b"\0" * 4096, [(b"content-encoding", b"gzip")])
+    assert status == 413
+    assert received is None
@@ -0,0 +1,125 @@
+from collections import OrderedDict
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.services import opensearch_service as opensearch_module
+from src.services.opensearch_service import OpenSearchService, INDEX_VERSION
+
+LONG_TEXT = " ".join(f"Legacy sentence {i} stored as a single document before chunking." for i in range(200))
+
+def _hit(doc_id, title, content, metadata=None):
+    return {
+        "_id": doc_id,
+        "_source": {"title": title, "content": content, "metadata": metadata or {}, "created_at": "2024-01-01T00:00:00"}
+    }
+
+@pytest.fixture
+def bulk_actions(monkeypatch):
+    """Record the actions of every _bulk request"""
+    actions = []
+
+    def fake_bulk(client, batch, **kwargs):
+        actions.extend(batch)
+        return len(batch), []
+
+    monkeypatch.setattr(opensearch_module.helpers, "bulk", fake_bulk)
+    return actions
+
+def _service(monkeypatch, pages):
+    """Service over a legacy (version 1) index whose search returns the given pages"""
+    monkeypatch.setattr(opensearch_module, "_embedding_cache", OrderedDict())
+    service = OpenSearchService.__new__(OpenSearchService)
+    service.index_name = "chatbot-documents"
+    service.physical_index_name = f"chatbot-documents-v{INDEX_VERSION}"
+    service.bulk_chunk_size = 500
+    service.client = MagicMock()
+    service.client.indices.get_mapping.return_value = {"chatbot-documents": {"mappings": {}}}
+    service.client.indices.exists.return_value = False
+    service.client.mget.return_value = {"docs": []}
+    service.client.search.side_effect = [{"hits": {"hits": page}} for page in pages]
+
+    async def fake_embedding(text):
+        return [0.1, 0.2, 0.3]
+
+    service._get_embedding_async = fake_embedding
+    return service
+
+@pytest.mark.parametrize("score,similarity", [(2.0, 1.0), (1.75, 0.75), (1.0, 0.0), (0.5, 0.0), (2.5, 1.0)])
+def test_similarity_maps_faiss_scores_to_unit_range(score, similarity):
+    """faiss innerproduct scores (1 + ip) are mapped back to [0, 1]"""
+    service = OpenSearchService.__new__(OpenSearchService)
+    assert service._similarity(score) == pytest.approx(similarity)
+
+def test_migration_rechunks_legacy_documents(monkeypatch, bulk_actions):
+    """Legacy whole documents are split and written with the same chunk ids as a fresh ingest"""
+    service = _service(monkeypatch, [[_hit("md5-id", "Guide", LONG_TEXT, {"source": "s3"})], []])
+
+    result = service.migrate_index()
+
+    document_id, expected = service._split_document("Guide", LONG_TEXT, {"source": "s3"})
+    assert result["status"] == "copied"
+    assert result["chunks"] == len(expected) > 1
+    assert [action["_id"] for action in bulk_actions] == [chunk["id"] for chunk in expected]
+    assert all(action["_index"] == service.physical_index_name for action in bulk_actions)
+    assert all(action["_source"]["metadata"]["document_id"] == document_id for action in bulk_actions)
+    assert all(action["_source"]["created_at"] == "2024-01-01T00:00:00" for action in bulk_actions)
+    service.client.indices.update_aliases.assert_not_called()
+
+def test_migration_replaces_legacy_chunk_metadata(monkeypatch, bulk_actions):
+    """Old document_id/chunk_index values are recomputed, other metadata is kept"""
+    legacy = {"source": "upload", "document_id": "old", "chunk_index": 3, "total_chunks": 9}
+    service = _service(monkeypatch, [[_hit("old-3", "Note", "Short note.", legacy)], []])
+
+    service.migrate_index()
+
+    metadata = bulk_actions[0]["_source"]["metadata"]
+    assert metadata["source"] == "upload"
+    assert metadata["document_id"] != "old"
+    assert (metadata["chunk_index"], metadata["total_chunks"]) == (0, 1)
+
+def test_migration_stops_at_time_budget_and_resumes(monkeypatch, bulk_actions):
+    """A call that runs out of time returns a cursor for the next call"""
+    service = _service(monkeypatch, [[_hit("a", "A", "First document.")]])
+
+    result = service.migrate_index(time_budget=0)
+    assert result == {**result, "status": "in_progress", "after": None, "documents": 0}
+
+    service.client.search.side_effect = [{"hits": {"hits": [_hit("b", "B", "Second document.")]}}, {"hits": {"hits": []}}]
+    result = service.migrate_index(after="a")
+    body = service.client.search.call_args_list[0].kwargs["body"]
+    assert body["search_after"] == ["a"]
+    assert result["status"] == "copied"
+    assert result["documents"] == 1
+
+def test_migration_skips_empty_documents(monkeypatch, bulk_actions):
+    """Documents without content are counted but not indexed"""
+    service = _service(monkeypatch, [[_hit("e", "Empty", "   ")], []])
+
+    result = service.migrate_index()
+
+    assert result["empty"] == 1
+    assert bulk_actions == []
+
+def test_up_to_date_index_is_not_migrated(monkeypatch, bulk_actions):
+    """An index already on the current mapping version is left alone"""
+    service = _service(monkeypatch, [])
+    service.client.indices.get_mapping.return_value = {
+        "chatbot-documents-v2": {"mappings": {"_meta": {"index_version": INDEX_VERSION}}}
+    }
+
+    assert service.migrate_index()["status"] == "up_to_date"
+    service.client.search.assert_not_called()
+
+def test_swap_moves_alias_atomically(monkeypatch):
+    """The alias moves to the new index and the old index is removed in one call"""
+    service = _service(monkeypatch, [])
+    service.client.indices.exists.return_value = True
+    service.client.indices.exists_alias.return_value = True
+    service.client.indices.get_alias.return_value = {"chatbot-documents-v1": {}}
+
+    assert service.swap_index_alias()["status"] == "migrated"
+    service.client.indices.update_aliases.assert_called_once_with(body={"actions": [
+        {"remove_index": {"index": "chatbot-documents-v1"}},
+        {"add": {"index": "chatbot-documents-v2", "alias": "chatbot-documents"}}
+    ]})
@@ -0,0 +1,80 @@
+import threading
+import time
+
+import pytest
+
+from src.services import opensearch_service as opensearch_module
+from src.services.opensearch_service import OpenSearchService, BULK_THREAD_COUNT, BULK_QUEUE_SIZE
+
+@pytest.fixture
+def service():
+    """OpenSearchService without connecting to a cluster (only what _parallel_bulk uses)"""
+    service = OpenSearchService.__new__(OpenSearchService)
+    service.client = object()
+    service.bulk_chunk_size = 10
+    return service
+
+def _actions(count: int, consumed: list = None):
+    for i in range(count):
+        if consumed is not None:
+            consumed.append(i)
+        yield {"_op_type": "index", "_index": "test", "_id": str(i), "_source": {"n": i}}
+
+def test_all_actions_are_sent_in_chunks(service, monkeypatch):
+    """Every action is sent once, in batches of at most bulk_chunk_size"""
+    batches = []
+    lock = threading.Lock()
+
+    def fake_bulk(client, actions, **kwargs):
+        with lock:
+            batches.append([action["_id"] for action in actions])
+        return len(actions), []
+
+    monkeypatch.setattr(opensearch_module.helpers, "bulk", fake_bulk)
+    indexed, errors = service._parallel_bulk(_actions(95))
+
+    assert indexed == 95
+    assert errors == []
+    assert all(len(batch) <= 10 for batch in batches)
+    assert sorted(int(doc_id) for batch in batches for doc_id in batch) == list(range(95))
+
+def test_errors_from_all_batches_are_collected(service, monkeypatch):
+    """Per-item errors from every batch are returned together"""
+    def fake_bulk(client, actions, **kwargs):
+        failed = [{"index": {"_id": action["_id"], "error": "boom"}} for action in actions if int(action["_id"]) % 7 == 0]
+        return len(actions) - len(failed), failed
+
+    monkeypatch.setattr(opensearch_module.helpers, "bulk", fake_bulk)
+    indexed, errors = service._parallel_bulk(_actions(50))
+
+    failed_ids = sorted(int(error["index"]["_id"]) for error in errors)
+    assert failed_ids == [0, 7, 14, 21, 28, 35, 42, 49]
+    assert indexed == 50 - len(failed_ids)
+
+def test_empty_input(service, monkeypatch):
+    """No actions means no _bulk requests"""
+    monkeypatch.setattr(opensearch_module.helpers, "bulk", lambda *args, **kwargs: pytest.fail("unexpected _bulk call"))
+    assert service._parallel_bulk(_actions(0)) == (0, [])
+
+def test_generator_is_consumed_with_backpressure(service, monkeypatch):
+    """While the workers are blocked, only a bounded number of batches is read ahead"""
+    release = threading.Event()
+    consumed = []
+
+    def fake_bulk(client, actions, **kwargs):
+        release.wait(5)
+        return len(actions), []
+
+    monkeypatch.setattr(opensearch_module.helpers, "bulk", fake_bulk)
+    result = {}
+    worker = threading.Thread(target=lambda: result.update(value=service._parallel_bulk(_actions(1000, consumed))))
+    worker.start()
+    time.sleep(0.2)
+
+    # Batches in flight plus the one waiting to be submitted
+    max_batches = BULK_THREAD_COUNT + BULK_QUEUE_SIZE + 1
+    assert len(consumed) <= max_batches * service.bulk_chunk_size
+
+    release.set()
+    worker.join(5)
+    assert result["value"] == (1000, [])
@@ -0,0 +1,77 @@
+import pytest
+
+# The cache lives in the Streamlit frontend; only run these when it is installed
+pytest.importorskip("streamlit")
+from frontend import app
+from frontend.app import ChatbotInterface, ResponseCache
+
+PAYLOAD = b'{"chat_history":[],"max_results":5,"message":"hola"}'
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = ResponseCache(ttl=60, max_entries=2)
+    monkeypatch.setattr(app, "get_response_cache", lambda: cache)
+    return cache
+
+@pytest.fixture
+def chatbot(monkeypatch):
+    """ChatbotInterface whose /chat/stream replays fixed events and counts calls"""
+    chatbot = ChatbotInterface.__new__(ChatbotInterface)
+    chatbot.backend_url = "http://backend"
+    chatbot.calls = 0
+
+    async def fake_stream_events(payload_json):
+        chatbot.calls += 1
+        yield "delta", {"delta": "Hola"}
+        yield "delta", {"delta": ", mundo"}
+        yield "done", {"sources": [{"title": "Doc"}], "confidence": 0.8}
+
+    chatbot._stream_events = fake_stream_events
+    return chatbot
+
+def _ask(chatbot, use_cache=True):
+    result = {}
+    result["message"] = "".join(chatbot.send_message_stream("hola", [], result, use_cache=use_cache))
+    return result
+
+def test_cache_expires_after_ttl(monkeypatch):
+    """Entries older than the TTL are dropped"""
+    now = [100.0]
+    monkeypatch.setattr(app.time, "monotonic", lambda: now[0])
+    cache = ResponseCache(ttl=10, max_entries=4)
+    cache.put("u", PAYLOAD, {"message": "x"})
+    assert cache.get("u", PAYLOAD) == {"message": "x"}
+    now[0] += 11
+    assert cache.get("u", PAYLOAD) is None
+
+def test_cache_evicts_least_recently_used():
+    """Above max_entries the least recently read entry goes first"""
+    cache = ResponseCache(ttl=60, max_entries=2)
+    cache.put("u", b"a", {"message": "a"})
+    cache.put("u", b"b", {"message": "b"})
+    cache.get("u", b"a")
+    cache.put("u", b"c", {"message": "c"})
+    assert cache.get("u", b"b") is None
+    assert cache.get("u", b"a") == {"message": "a"}
+
+def test_cache_returns_copies():
+    """Callers can annotate a cached response without changing the stored one"""
+    cache = ResponseCache()
+    cache.put("u", PAYLOAD, {"message": "x", "sources": [{"title": "Doc"}]})
+    cache.get("u", PAYLOAD)["sources"][0]["_label"] = "1. Doc"
+    assert cache.get("u", PAYLOAD)["sources"] == [{"title": "Doc"}]
+
+def test_stream_is_memoized_after_done(cache, chatbot):
+    """The first answer streams; the same question is then served from the cache"""
+    first = _ask(chatbot)
+    second = _ask(chatbot)
+    assert chatbot.calls == 1
+    assert first["message"] == second["message"] == "Hola, mundo"
+    assert second["confidence"] == 0.8
+    assert second["sources"] == [{"title": "Doc"}]
+
+def test_force_refresh_bypasses_cache(cache, chatbot):
+    """With use_cache=False the backend is always called"""
+    _ask(chatbot)
+    _ask(chatbot, use_cache=False)
+    assert chatbot.calls == 2
@@ -0,0 +1,67 @@
+import base64
+import gzip
+
+import orjson
+import pytest
+
+pytest.importorskip("uvloop")
+
+from src.core.utils.compression import gunzip_limited, PayloadTooLargeError
+from src.handlers import simple_handler
+from src.handlers.simple_handler import _request_body
+
+BODY = orjson.dumps({"message": "What is AWS?", "max_results": 3})
+
+@pytest.fixture
+def small_limit(monkeypatch):
+    """Decompress handler bodies with a 1 KiB limit"""
+    monkeypatch.setattr(simple_handler, "gunzip_limited", lambda data: gunzip_limited(data, max_size=1024))
+
+def _event(body, base64_encoded=False, encoding=None):
+    return {
+        "httpMethod": "POST",
+        "path": "/chat",
+        "headers": {"Content-Encoding": encoding} if encoding else {},
+        "body": body,
+        "isBase64Encoded": base64_encoded
+    }
+
+def test_plain_body_is_returned_unchanged():
+    """A plain JSON body is passed through as-is"""
+    assert _request_body(_event(BODY.decode())) == BODY.decode()
+
+def test_missing_body():
+    """Requests without a body return None"""
+    assert _request_body({"httpMethod": "GET"}) is None
+
+def test_base64_body_is_decoded():
+    """Binary bodies from API Gateway are base64-decoded"""
+    assert _request_body(_event(base64.b64encode(BODY).decode(), base64_encoded=True)) == BODY
+
+def test_gzip_body_is_decompressed():
+    """A base64 gzip body with Content-Encoding: gzip is inflated (header name is case-insensitive)"""
+    event = _event(base64.b64encode(gzip.compress(BODY)).decode(), base64_encoded=True, encoding="gzip")
+    event["headers"] = {"content-encoding": "gzip"}
+    assert _request_body(event) == BODY
+
+def test_body_already_inflated_by_api_gateway():
+    """A body that is no longer gzip is not decompressed again"""
+    assert _request_body(_event(base64.b64encode(BODY).decode(), base64_encoded=True, encoding="gzip")) == BODY
+
+def test_gzip_bomb_raises(small_limit):
+    """Bodies that inflate beyond the limit raise PayloadTooLargeError"""
+    event = _event(base64.b64encode(gzip.compress(b"\0" * (1024 * 1024))).decode(), base64_encoded=True, encoding="gzip")
+    with pytest.raises(PayloadTooLargeError):
+        _request_body(event)
+
+@pytest.mark.parametrize("payload,status", [
+    (gzip.compress(b"\0" * (1024 * 1024)), 413),
+    (gzip.compress(BODY)[:-6], 400),
+])
+def test_chat_rejects_bad_gzip_bodies(monkeypatch, small_limit, payload, status):
+    """/chat answers 413 for gzip bombs and 400 for corrupt gzip, before touching any service"""
+    monkeypatch.setattr(simple_handler, "_get_os", lambda: pytest.fail("service used"))
+    response = simple_handler.lambda_handler(_event(base64.b64encode(payload).decode(), base64_encoded=True, encoding="gzip"), None)
+
+    assert response["statusCode"] == status
+    assert "message" in orjson.loads(response["body"])
@@ -0,0 +1,57 @@
+import asyncio
+
+import orjson
+import pytest
+
+from src.core.utils.sse import format_sse
+
+# The parser lives in the Streamlit frontend; only run these when it is installed
+pytest.importorskip("streamlit")
+from frontend.app import _parse_sse
+
+def _parse(text: str):
+    """Run the frontend SSE parser over the lines of text"""
+    async def lines():
+        for line in text.split("\n"):
+            yield line
+
+    async def collect():
+        return [item async for item in _parse_sse(lines())]
+
+    return asyncio.run(collect())
+
+def test_format_sse_without_event():
+    """A frame without event name is a single data line plus a blank line"""
+    assert format_sse({"delta": "hola"}) == 'data: {"delta":"hola"}\n\n'
+
+def test_format_sse_with_event():
+    """The event line goes before the data line"""
+    assert format_sse({"confidence": 0.5}, event="done") == 'event: done\ndata: {"confidence":0.5}\n\n'
+
+def test_format_sse_escapes_newlines():
+    """Newlines inside the payload stay inside the JSON string"""
+    frame = format_sse({"delta": "línea 1\nlínea 2"})
+    assert frame.count("\n") == 2
+    assert orjson.loads(frame[len("data: "):]) == {"delta": "línea 1\nlínea 2"}
+
+def test_parse_round_trip():
+    """Deltas default to the delta event and named events keep their name"""
+    stream = (
+        format_sse({"delta": "Hola"})
+        + format_sse({"delta": ", mundo"})
+        + format_sse({"sources": [], "confidence": 0.8}, event="done")
+    )
+    assert _parse(stream) == [
+        ("delta", {"delta": "Hola"}),
+        ("delta", {"delta": ", mundo"}),
+        ("done", {"sources": [], "confidence": 0.8}),
+    ]
+
+def test_parse_event_resets_after_blank_line():
+    """An event name only applies to its own frame"""
+    stream = format_sse({"message": "boom"}, event="error") + format_sse({"delta": "x"})
+    assert _parse(stream) == [("error", {"message": "boom"}), ("delta", {"delta": "x"})]
+
+def test_parse_ignores_comments():
+    """Comment and keep-alive lines are skipped"""
+    assert _parse(": keep-alive\n\n" + format_sse({"delta": "x"})) == [("delta", {"delta": "x"})]
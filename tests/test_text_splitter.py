@@ -0,0 +1,53 @@
+import pytest
+
+from src.core.utils.text_splitter import split_text
+
+SENTENCES = " ".join(f"Sentence number {i} talks about AWS services." for i in range(200))
+
+@pytest.mark.parametrize("text", ["", "   ", "\n\n\t  \n"])
+def test_empty_or_whitespace_input(text):
+    """Empty and whitespace-only text produce no chunks"""
+    assert split_text(text, chunk_size=100, chunk_overlap=20) == []
+
+def test_short_text_is_single_chunk():
+    """Text shorter than chunk_size is returned stripped as one chunk"""
+    assert split_text("  Hello world.  ", chunk_size=100, chunk_overlap=20) == ["Hello world."]
+
+@pytest.mark.parametrize("chunk_size,chunk_overlap", [(50, 0), (100, 20), (300, 100), (1000, 200)])
+def test_chunks_never_exceed_chunk_size(chunk_size, chunk_overlap):
+    """Every chunk respects len(chunk) <= chunk_size"""
+    chunks = split_text(SENTENCES, chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    assert chunks
+    assert all(len(chunk) <= chunk_size for chunk in chunks)
+
+def test_no_separators_longer_than_chunk_size():
+    """A single long word is cut at chunk_size without losing text"""
+    text = "x" * 1050
+    chunks = split_text(text, chunk_size=100, chunk_overlap=0)
+    assert all(len(chunk) <= 100 for chunk in chunks)
+    assert "".join(chunks) == text
+
+def test_splits_on_spaces_without_sentence_breaks():
+    """Without sentence breaks, chunks end on word boundaries"""
+    words = [f"word{i}" for i in range(300)]
+    chunks = split_text(" ".join(words), chunk_size=100, chunk_overlap=0)
+    assert all(len(chunk) <= 100 for chunk in chunks)
+    assert " ".join(chunks).split() == words
+
+def test_prefers_sentence_boundaries():
+    """Chunks end at a sentence end when one fits in the window"""
+    chunks = split_text(SENTENCES, chunk_size=200, chunk_overlap=0)
+    assert all(chunk.endswith(".") for chunk in chunks)
+
+def test_overlap_repeats_trailing_sentences():
+    """With overlap, the next chunk starts with a sentence from the end of the previous one"""
+    chunks = split_text(SENTENCES, chunk_size=200, chunk_overlap=100)
+    assert len(chunks) > 1
+    for previous, current in zip(chunks, chunks[1:]):
+        first_sentence = current.split(". ")[0]
+        assert first_sentence in previous
+
+def test_without_overlap_text_is_not_repeated():
+    """With chunk_overlap=0 every sentence appears exactly once"""
+    chunks = split_text(SENTENCES, chunk_size=200, chunk_overlap=0)
+    assert " ".join(chunks) == SENTENCES